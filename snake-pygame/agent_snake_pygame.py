@@ -8,27 +8,49 @@ Created on Sun Jul 25 18:57:46 2021
 # importing libraries
 import torch
 import random
-import numpy as np
 from collections import deque
 from snake_pygame_ai import SnakeGameAI 
-from snake_pygame_ai import Direction 
-from snake_pygame_ai import Point
-from model_snake_pygame import Linear_QNet, QTrainer
+from state_snake_pygame import get_state
+from model_snake_pygame import Linear_QNet, QTrainer, PolicyCache
+from replay_snake_pygame import CompactReplayMemory, augment_batch
+from dataset_snake_pygame import ReplayDatasetWriter, ReplayDataset, process_prefix
 from helper_snake_pygame import plot
+from telemetry_snake_pygame import TrainingTelemetry
+from start_states_snake_pygame import StartStateLibrary
 
 
 MAX_MEMORY = 100_000
 BATCH_SIZE = 1000
 LEARNING_RATE = 0.001
-# a block size for coordinate reference in game window
-BLOCK_SIZE = 20
 
 class Agent():
-    def __init__(self):
+    def __init__(self, compact_memory = False, memory_size = MAX_MEMORY, spill_path = None,
+                 dataset_folder = None, dataset_prefix = None, policy_cache = False, augment = False):
+        """
+        compact_memory : store transitions bit packed in a CompactReplayMemory instead of a deque
+        memory_size : number of transitions kept in memory
+        spill_path : file the compact memory appends evicted transitions to, None drops them
+        dataset_folder : if given, every remembered transition is also appended to this on disk dataset
+        dataset_prefix : chunk file prefix in dataset_folder, None uses process_prefix() (hostname-pid),
+                         so processes sharing a folder never append to the same chunk
+        policy_cache : pick greedy actions from a PolicyCache lookup table instead of a forward pass
+        augment : add the mirrored and rotated copies of every sampled transition to the long memory batch
+        """
         self.number_of_games = 0
         self.epsilon = 0 # randomness parameter
+        self.exploration_games = 80 # games with random moves, 0 after pretraining on demonstrations
         self.gamma = 0.9 # discount rate, must be smaller than 1
-        self.memory = deque(maxlen = MAX_MEMORY) # popleft() if memory greater than MAX_MEMORY
+        self.compact_memory = compact_memory
+        self.augment = augment
+        if self.compact_memory:
+            self.memory = CompactReplayMemory(memory_size, spill_path)
+        else:
+            self.memory = deque(maxlen = memory_size) # popleft() if memory greater than memory_size
+        if dataset_folder is not None:
+            prefix = dataset_prefix if dataset_prefix is not None else process_prefix()
+            self.dataset_writer = ReplayDatasetWriter(dataset_folder, prefix = prefix)
+        else:
+            self.dataset_writer = None
         
         # model parameters
         self.input_size = 11
@@ -37,77 +59,15 @@ class Agent():
         
         self.model = Linear_QNet(self.input_size, self.hidden_size, self.output_size)
         self.trainer = QTrainer(self.model, learning_rate = LEARNING_RATE, gamma = self.gamma)
+        
+        # the cache is rebuilt after every long memory training and model load,
+        # in between it ignores the small short memory updates
+        self.policy_cache = PolicyCache(self.model) if policy_cache else None
         # TODO : model, trainer
         
     def get_state(self, game):
-        # current head position of snake in the game
-        head = game.snake[0]
-        
-        # current 4 coordinates next to snake head
-        point_left_of_head = Point(head.x - BLOCK_SIZE, head.y)
-        point_right_of_head = Point(head.x + BLOCK_SIZE, head.y)
-        point_up_of_head = Point(head.x, head.y - BLOCK_SIZE)
-        point_down_of_head = Point(head.x, head.y + BLOCK_SIZE)
-        
-        # current snake head direction
-        direction_left = game.direction == Direction.LEFT
-        direction_right = game.direction == Direction.RIGHT
-        direction_up = game.direction == Direction.UP
-        direction_down = game.direction == Direction.DOWN
-        
-        # state values = [danger straight, danger right, danger left,
-        #                 direction_left, direction_right, direction_up, direction_down,
-        #                 food_left, food_right, food_up, food_down]
-        
-        state = [
-                # Danger Straight
-                # check if snake direction is right and collision point is also at right
-                (direction_right and game.is_collision(point_right_of_head)) or
-                # check if snake direction is left and collision point is also at left
-                (direction_left and game.is_collision(point_left_of_head)) or
-                # check if snake direction is up and collision point is also at up
-                (direction_up and game.is_collision(point_up_of_head)) or
-                # check if snake direction is down and collision point is also at down
-                (direction_down and game.is_collision(point_down_of_head)),
-                
-                # Danger Right
-                # check if snake direction is up and collision point is at right
-                (direction_up and game.is_collision(point_right_of_head)) or
-                # check if snake direction is down and collision point is at left
-                (direction_down and game.is_collision(point_left_of_head)) or
-                # check if snake direction is left and collision point is at up
-                (direction_left and game.is_collision(point_up_of_head)) or
-                # check if snake direction is right and collision point is at down
-                (direction_right and game.is_collision(point_down_of_head)),
-                
-                # Danger left
-                # check if snake direction is up and collision point is at right
-                (direction_down and game.is_collision(point_right_of_head)) or
-                # check if snake direction is down and collision point is at left
-                (direction_up and game.is_collision(point_left_of_head)) or
-                # check if snake direction is left and collision point is at up
-                (direction_right and game.is_collision(point_up_of_head)) or
-                # check if snake direction is right and collision point is at down
-                (direction_left and game.is_collision(point_down_of_head)),
-                
-                # current direction of the snake
-                direction_left, 
-                direction_right, 
-                direction_up, 
-                direction_down,
-                
-                # Food location
-                # food is present at left direction of snake's head
-                game.food.x < game.head.x,
-                # food is present at right direction of snake's head
-                game.food.x > game.head.x,
-                # food is present at up direction of snake's head
-                game.food.y < game.head.y,
-                # food is present at down direction of snake's head
-                game.food.y > game.head.y
-                ]
-        
-        return np.array(state, dtype = int)
+        # state features are computed in state_snake_pygame, shared with the tabular agent
+        return get_state(game)
         
         
     
@@ -121,9 +81,22 @@ class Agent():
         """
         # popleft if MAX_MEMORY is reached
         self.memory.append((state, action, reward, next_state, done))
+        
+        # keep the experience for offline training after this run
+        if self.dataset_writer is not None:
+            self.dataset_writer.append((state, action, reward, next_state, done))
     
     def train_long_memory(self):
         # when we want to train over model on batches of data
+        if self.compact_memory:
+            # the compact memory samples and decodes a whole batch at once
+            states, actions, rewards, next_states, dones = self.memory.sample(BATCH_SIZE)
+            if self.augment:
+                states, actions, rewards, next_states, dones = augment_batch(states, actions, rewards, next_states, dones)
+            self.trainer.train_step(states, actions, rewards, next_states, dones)
+            self.invalidate_policy_cache()
+            return
+        
         if len(self.memory) > BATCH_SIZE:
             # list of tuples
             mini_sample = random.sample(self.memory, BATCH_SIZE)
@@ -132,8 +105,31 @@ class Agent():
         
         # extract the information from the mini sample into a proper tabular/matrix format
         states, actions, rewards, next_states, dones = zip(*mini_sample)
+        
+        # every stored step also trains as its mirror images, the transforms are index permutations over the batch
+        if self.augment:
+            states, actions, rewards, next_states, dones = augment_batch(states, actions, rewards, next_states, dones)
         # training on mini batch
         self.trainer.train_step(states, actions, rewards, next_states, dones)
+        self.invalidate_policy_cache()
+    
+    def invalidate_policy_cache(self):
+        # weights changed, the cached greedy actions are rebuilt on the next lookup
+        if self.policy_cache is not None:
+            self.policy_cache.invalidate()
+    
+    def load_model(self, filename = "model.pth"):
+        self.model.load(filename)
+        self.invalidate_policy_cache()
+    
+    def pretrain(self, demonstration_folder, epochs = 5):
+        """
+        behavior cloning on recorded demonstrations (see snake_game.py),
+        the pretrained agent skips the random exploration phase
+        """
+        self.trainer.behavior_cloning(ReplayDataset(demonstration_folder), BATCH_SIZE, epochs)
+        self.exploration_games = 0
+        self.invalidate_policy_cache()
     
     def train_short_memory(self, state, action, reward, next_state, done):
         # when we want to train our model on smaller steps like 1-5
@@ -144,7 +140,7 @@ class Agent():
         
         # epsilon is randomness parameter
         # epsilon is inversly proportional to no of games played
-        self.epsilon = 80 - self.number_of_games
+        self.epsilon = self.exploration_games - self.number_of_games
         # an empty state initialization
         next_action = [0, 0, 0]
         
@@ -153,6 +149,10 @@ class Agent():
             # a random move
             move = random.randint(0, 2)
             next_action[move] = 1
+        elif self.policy_cache is not None:
+            # greedy move looked up from the cached policy table
+            move = self.policy_cache.action(state)
+            next_action[move] = 1
         else:
             # current state Pytorch tensor
             state_zero = torch.tensor(state, dtype = torch.float)
@@ -165,59 +165,126 @@ class Agent():
         
         return next_action
     
-def train():
+def train(render = True, plot_results = True, role = "actor", cores = None, dataset_folder = None,
+          dataset_prefix = None, demonstration_folder = None, telemetry_port = None, loop_detection = None,
+          augment = False, start_states = None):
+    """
+    render : draw the game window, set False for headless workers
+    plot_results : plot scores after every game, set False to never load matplotlib / IPython
+    role : torch threading role of this process, see ROLE_THREADS in model_snake_pygame,
+           "actor" by default : this process plays and learns, and nearly every torch call in it is a batch 1
+           get_action or train_short_memory, the one long memory batch per game does not pay for more threads
+    cores : list of cores to pin this process to, None leaves the affinity alone
+    dataset_folder : on disk dataset every transition is appended to, None keeps nothing
+    dataset_prefix : chunk file prefix of this process in dataset_folder, None uses hostname-pid
+    demonstration_folder : recorded demonstrations to pretrain on by behavior cloning before playing
+    telemetry_port : serve live Prometheus metrics on http://127.0.0.1:<port>/metrics, None serves nothing
+    loop_detection : None, "end" or "penalize", acts on games where the snake runs in a circle, see SnakeCore,
+                     "end" cuts the game on the first repeated state and stores that last step as not done
+    augment : train the long memory on the mirrored and rotated copies of every sampled transition too
+    start_states : StartStateLibrary, or the path of a saved one, some games start from its snapshots
+                   and snapshots of the training games are added to it, None starts every game fresh
+    """
     plot_scores = [] # list to keep track of scores
     plot_mean_scores = [] # list to keep track of mean scores
     total_score = 0
     best_score = 0
     
-    agent = Agent()
-    game = SnakeGameAI()
+    if isinstance(start_states, str):
+        start_states = StartStateLibrary().load(start_states)
+    
+    agent = Agent(dataset_folder = dataset_folder, dataset_prefix = dataset_prefix, augment = augment)
+    game = SnakeGameAI(render = render, loop_detection = loop_detection, start_states = start_states)
+    
+    # a "learner" role tunes its thread count once, on the long memory batch size
+    thread_config = agent.trainer.configure_threads(role, cores = cores, batch_size = BATCH_SIZE)
+    print("Threads ", thread_config)
+    
+    # the counters are cheap, so they are always kept, the endpoint is optional
+    telemetry = TrainingTelemetry()
+    telemetry.thread_config = thread_config
+    if telemetry_port is not None:
+        telemetry.start_server(telemetry_port)
+    
+    if demonstration_folder is not None:
+        agent.pretrain(demonstration_folder)
     
     while True:
-        # get current state
-        current_state = agent.get_state(game)
-        
-        # move based on current state
-        next_action = agent.get_action(current_state)
+        with telemetry.phase("act"):
+            # get current state
+            current_state = agent.get_state(game)
+            
+            # move based on current state
+            next_action = agent.get_action(current_state)
         
-        # perform move and get new state
-        reward, done, score = game.play_step(next_action)
-        new_state = agent.get_state(game)
+        with telemetry.phase("env"):
+            # perform move and get new state
+            reward, done, score = game.play_step(next_action)
+            new_state = agent.get_state(game)
+            if start_states is not None and not done:
+                start_states.record(game)
+            # a game cut by loop detection ends here, but the snake did not die, new_state is bootstrapped
+            terminal = done and not game.truncated
         
-        # train on short memory
-        agent.train_short_memory(current_state, next_action, reward, new_state, done)
+        with telemetry.phase("train_short"):
+            # train on short memory
+            agent.train_short_memory(current_state, next_action, reward, new_state, terminal)
         
-        # remember
-        agent.remember(current_state, next_action, reward, new_state, done)
+        with telemetry.phase("remember"):
+            # remember
+            agent.remember(current_state, next_action, reward, new_state, terminal)
+        telemetry.record_steps(env_steps = 1, train_steps = 1)
         
         # if game over
         if done:
             # train the long long memory
             # plot the results
             
-            # resetting the game first
+            # resetting the game first, keeping why and from where the game ended
+            end_reason = game.end_reason
+            resumed = game.resumed
+            if start_states is not None:
+                start_states.end_episode(end_reason)
             game.reset()
             
             # increment the no of games played by agent
             agent.number_of_games += 1
             
-            agent.train_long_memory()
+            with telemetry.phase("train_long"):
+                agent.train_long_memory()
+            telemetry.record_steps(train_steps = 1)
+            
+            # write the finished game to disk
+            if agent.dataset_writer is not None:
+                with telemetry.phase("dataset"):
+                    agent.dataset_writer.flush()
+            telemetry.record_replay(agent.memory)
+            
+            telemetry.record_game(score, end_reason, start = "resumed" if resumed else "fresh")
+            
+            # a game started from a stored position did not earn its whole score,
+            # it is trained on and has its own telemetry label, but is not plotted or checkpointed
+            if resumed:
+                print("Game ", agent.number_of_games, "Resumed score ", score, "Ended by ", end_reason)
+                continue
             
             if score > best_score:
                 best_score = score
                 
                 # whenever get a high score, save that model
                 agent.model.save()
+                telemetry.record_checkpoint()
             
-            print("Game ", agent.number_of_games, "Score ", score, "Best Score ", best_score)
+            print("Game ", agent.number_of_games, "Score ", score, "Best Score ", best_score, "Ended by ", end_reason)
             
             # plotting
             plot_scores.append(score)
             total_score += score
-            mean_score = total_score / agent.number_of_games
+            mean_score = total_score / len(plot_scores)
             plot_mean_scores.append(mean_score)
-            plot(plot_scores, plot_mean_scores)
+            if plot_results:
+                with telemetry.phase("plot"):
+                    plot(plot_scores, plot_mean_scores)
             
 if __name__ == "__main__":
     train()
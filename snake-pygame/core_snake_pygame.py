@@ -0,0 +1,467 @@
+# game core shared by the human and the AI snake game
+# SnakeCore holds the rules (movement, collisions, food, rewards) without any pygame state,
+# drawing is done by a renderer, so the same engine runs in a window or headless
+
+import copy
+import random
+from enum import Enum
+from collections import namedtuple, deque, Counter
+import os
+import sys
+
+# pygame and the game font are loaded lazily by load_pygame(), so headless workers
+# which never render a frame do not pay for initializing the display, audio and font modules
+pygame = None
+font = None
+
+# bundled font file, resolved relative to this module rather than the working directory
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arial.ttf")
+
+# lightweight namedtuple object can be accessible through name or indices
+Point = namedtuple("Point", ["x", "y"])
+
+# a block size for coordinate reference in game window
+BLOCK_SIZE = 20
+
+# clock framerate parameters, fps rate
+SPEED = 10
+
+# RGB colors
+WHITE = (255, 255, 255)
+RED = (200, 0, 0)
+BLUE1 = (0, 0, 255) # color for outer square of snake body
+BLUE2 = (0, 100, 255) # color for inner square of snake body
+BLACK = (0, 0, 0)
+
+# snapshot of everything that defines a game, see SnakeCore.snapshot()
+GameState = namedtuple("GameState", ["snake", "occupied", "head", "direction", "food", "score", "frame_iteration",
+                                     "loop_detector"])
+
+# what to do when a loop is detected, see SnakeCore
+LOOP_ACTIONS = [None, "end", "penalize"]
+
+# reward subtracted for every repeated state when loops are penalized instead of ended
+LOOP_PENALTY = 1
+
+# modulus and base of the rolling body hash, 2 ** 61 - 1 is prime so the base has an inverse
+HASH_MODULUS = 2 ** 61 - 1
+HASH_BASE = 1_000_003
+HASH_BASE_INVERSE = pow(HASH_BASE, -1, HASH_MODULUS)
+
+# random hash key of every cell, drawn from a private generator so the game's food placement is not affected
+CELL_KEYS = {}
+_cell_key_random = random.Random(20211026)
+
+def cell_key(pt):
+    key = CELL_KEYS.get(pt)
+    if key is None:
+        key = CELL_KEYS[pt] = _cell_key_random.randrange(1, HASH_MODULUS)
+    return key
+
+class Direction(Enum):
+    RIGHT = 1
+    LEFT = 2
+    UP = 3
+    DOWN = 4
+
+# list of all the possible Enum Direction values in clockwise direction
+CLOCK_WISE = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+
+# relative actions, [straight, right, left]
+ACTIONS = [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+
+def load_pygame():
+    """
+    imports and initializes pygame and the game font on first use,
+    later calls return the already loaded module
+    """
+    global pygame, font
+    if pygame is None:
+        import pygame as _pygame
+
+        # initializing pygame modules
+        _pygame.init()
+
+        # initialize game font
+        font = _pygame.font.Font(FONT_PATH, 25)
+        pygame = _pygame
+
+    return pygame
+
+def turn(direction, action):
+    """
+    direction : current Direction of the snake
+    action : [straight, right, left] one hot list
+    returns the new absolute Direction, the snake can only go straight or take a right or left turn
+    """
+    current_direction_idx = CLOCK_WISE.index(direction)
+
+    # action == right turn direction, r -> d -> l -> u
+    if action[1]:
+        return CLOCK_WISE[(current_direction_idx + 1) % 4]
+    # action == left turn direction, r -> u -> l -> d
+    if action[2]:
+        return CLOCK_WISE[(current_direction_idx - 1) % 4]
+    # go straight or no change
+    return direction
+
+def relative_action(direction, new_direction):
+    """
+    inverse of turn(), the [straight, right, left] action which changes direction into new_direction
+    returns None for a reversal, which has no relative action
+    """
+    steps = (CLOCK_WISE.index(new_direction) - CLOCK_WISE.index(direction)) % 4
+    if steps == 2:
+        return None
+    return list(ACTIONS[{0 : 0, 1 : 1, 3 : 2}[steps]])
+
+class LoopDetector():
+    """
+    remembers every state (body, direction, food) since the last food was eaten and reports exact repeats
+    the body is hashed as sum(key(cell) * BASE ** time the cell was entered), normalized by the time of the tail,
+    so moving the snake updates the hash in O(1) while the order of the body blocks still counts
+    the same state twice means the snake is going in circles: with a fixed deterministic policy it never eats again,
+    with random moves or changing weights it may still get out, so a loop is a cut, not a death, see SnakeCore
+    """
+    def __init__(self, snake):
+        # the tail entered at time 0, the head at time len(snake) - 1
+        self.body_hash = 0
+        power = 1
+        for pt in reversed(snake):
+            self.body_hash = (self.body_hash + cell_key(pt) * power) % HASH_MODULUS
+            power = power * HASH_BASE % HASH_MODULUS
+        self.head_power = power * HASH_BASE_INVERSE % HASH_MODULUS
+        self.tail_power = 1
+        self.tail_power_inverse = 1
+        self.seen = set()
+
+    def copy(self):
+        detector = copy.copy(self)
+        detector.seen = set(self.seen)
+        return detector
+
+    def add_head(self, head):
+        self.head_power = self.head_power * HASH_BASE % HASH_MODULUS
+        self.body_hash = (self.body_hash + cell_key(head) * self.head_power) % HASH_MODULUS
+
+    def remove_tail(self, tail):
+        self.body_hash = (self.body_hash - cell_key(tail) * self.tail_power) % HASH_MODULUS
+        self.tail_power = self.tail_power * HASH_BASE % HASH_MODULUS
+        self.tail_power_inverse = self.tail_power_inverse * HASH_BASE_INVERSE % HASH_MODULUS
+
+    def repeated(self, direction, food, length):
+        # True if this exact state was seen before, otherwise it is remembered
+        state = (self.body_hash * self.tail_power_inverse % HASH_MODULUS, length, direction, food)
+        if state in self.seen:
+            return True
+        self.seen.add(state)
+        return False
+
+    def clear(self):
+        # after eating the snake is longer, no earlier state can come back
+        self.seen.clear()
+
+class SnakeCore():
+    """
+    snake game rules without any rendering
+    the body is a deque (head first) plus a counter of occupied cells, so moving and
+    collision checks are O(1) no matter how long the snake is
+    snapshot() and restore() are O(1): a snapshot shares the body with the game,
+    which copies it (copy on write) the next time it moves
+    end_reason tells why the last game ended: "collision", "starvation", "loop" or "won" (the snake fills the board)
+    resumed tells if the current game started from a snapshot of another game instead of the start position
+    truncated tells if the last game was cut short instead of lost or won, its last state is not terminal
+    """
+    def __init__(self, width = 640, height = 480, start_length = 2, starvation_limit = None, loop_detection = None,
+                 start_states = None):
+        """
+        width, height : size of the playing field in pixels
+        start_length : number of blocks of the snake at the start of a game
+        starvation_limit : the game ends after starvation_limit * len(snake) steps,
+                           None lets the game go on forever (human play)
+        loop_detection : None, "end" to cut the game as soon as a state repeats without eating in between,
+                         or "penalize" to subtract LOOP_PENALTY from the reward of every repeated state,
+                         a repeat only proves a loop under a fixed policy, so "end" is a truncation :
+                         game_over without the -10, and truncated is True, store the last transition as not done
+        start_states : StartStateLibrary reset() may sample the start of a game from, None always starts fresh
+        """
+        if loop_detection not in LOOP_ACTIONS:
+            raise ValueError("unknown loop_detection : {}, expected one of {}".format(loop_detection, LOOP_ACTIONS))
+
+        self.width = width
+        self.height = height
+        self.start_length = start_length
+        self.starvation_limit = starvation_limit
+        self.loop_detection = loop_detection
+        self.start_states = start_states
+        # number of blocks of the board, the game is won when the snake covers all of them
+        self.cells = (width // BLOCK_SIZE) * (height // BLOCK_SIZE)
+        self.reset()
+
+    def reset(self):
+        """
+        resets game state after every time the game ends
+        """
+        # some games go on from a stored position instead of the start, see StartStateLibrary
+        state = self.start_states.sample() if self.start_states is not None else None
+        if state is not None:
+            self.resume(state)
+            return
+        self.resumed = False
+
+        # snake direction
+        self.direction = Direction.RIGHT
+
+        # snake head at the middle of the game window, on the block grid
+        self.head = Point(self.width // 2, self.height // 2)
+
+        # snake body, start_length blocks to the left of the head
+        self.snake = deque(Point(self.head.x - i * BLOCK_SIZE, self.head.y) for i in range(self.start_length))
+        self.occupied = Counter(self.snake)
+        self.loop_detector = LoopDetector(self.snake) if self.loop_detection is not None else None
+        self.shared_body = False # True while a snapshot references snake, occupied and loop_detector
+        self.end_reason = None
+
+        # initialize score
+        self.score = 0
+
+        # initialize food and place in game window
+        self.food = None
+        self.place_food()
+        if self.loop_detector is not None:
+            self.loop_detector.repeated(self.direction, self.food, len(self.snake))
+
+        # initialize frame iteration variable
+        # the variable helps break the game if the snake goes for a large time without collision or eating the food
+        self.frame_iteration = 0
+
+    def snapshot(self):
+        # immutable view of the current game, the body is shared until the game moves again
+        self.shared_body = True
+        return GameState(self.snake, self.occupied, self.head, self.direction,
+                         self.food, self.score, self.frame_iteration, self.loop_detector)
+
+    def restore(self, state):
+        # goes back to a snapshot, the body stays shared with the snapshot until the next move
+        self.snake = state.snake
+        self.occupied = state.occupied
+        self.head = state.head
+        self.direction = state.direction
+        self.food = state.food
+        self.score = state.score
+        self.frame_iteration = state.frame_iteration
+        self.loop_detector = state.loop_detector
+        self.shared_body = True
+        self.end_reason = None
+
+    def resume(self, state):
+        """
+        starts a new game from a snapshot of another game with the same rules,
+        with a fresh starvation counter and no loop history, the snapshot itself is never modified
+        """
+        self.restore(state)
+        self.frame_iteration = 0
+        self.resumed = True
+        if self.loop_detection is not None:
+            self.loop_detector = LoopDetector(self.snake)
+            self.loop_detector.repeated(self.direction, self.food, len(self.snake))
+
+    @property
+    def truncated(self):
+        # a loop cuts the game short, the snake is still alive
+        return self.end_reason == "loop"
+
+    def copy(self):
+        # independent game with the same state, e.g. to simulate moves without touching this one
+        game = copy.copy(self)
+        game.restore(self.snapshot())
+        return game
+
+    def own_body(self):
+        # copy on write, called before the body is modified
+        if self.shared_body:
+            self.snake = deque(self.snake)
+            self.occupied = Counter(self.occupied)
+            if self.loop_detector is not None:
+                self.loop_detector = self.loop_detector.copy()
+            self.shared_body = False
+
+    def place_food(self):
+        # random free block of the grid, there must be one : step() ends the game when the board is full
+        while True:
+            x = random.randint(0, (self.width - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
+            y = random.randint(0, (self.height - BLOCK_SIZE) // BLOCK_SIZE) * BLOCK_SIZE
+            self.food = Point(x, y)
+            if self.food not in self.occupied:
+                break
+
+    def turn(self, action):
+        # absolute direction after taking the relative [straight, right, left] action
+        return turn(self.direction, action)
+
+    def next_head(self, direction):
+        # head position after one step in the given direction
+        x = self.head.x
+        y = self.head.y
+
+        if direction == Direction.RIGHT:
+            x += BLOCK_SIZE
+        elif direction == Direction.LEFT:
+            x -= BLOCK_SIZE
+        elif direction == Direction.DOWN:
+            y += BLOCK_SIZE
+        elif direction == Direction.UP:
+            y -= BLOCK_SIZE
+
+        return Point(x, y)
+
+    def is_outside(self, pt):
+        # True if pt is outside of the game window
+        return pt.x > self.width - BLOCK_SIZE or pt.x < 0 or pt.y > self.height - BLOCK_SIZE or pt.y < 0
+
+    def is_collision(self, pt = None):
+        """
+        pt : any coordinate, defaults to the head
+        True if pt is outside of the window or on the snake body,
+        the head itself only collides when it has run into the body (the cell is occupied twice)
+        """
+        if pt is None:
+            pt = self.head
+
+        # hits boundary
+        if self.is_outside(pt):
+            return True
+
+        # hits itself
+        return self.occupied[pt] > (1 if pt == self.head else 0)
+
+    def step(self, direction):
+        """
+        moves the snake one block in the given absolute direction
+        returns reward, game_over, score
+        """
+        # incrementing frame_iteration value by 1, everytime step() gets called
+        self.frame_iteration += 1
+
+        # 1. Snake movement
+        # the tail is still in place while we check the new head, running into it is a collision
+        self.own_body()
+        self.direction = direction
+        self.head = self.next_head(direction)
+        collision = self.is_outside(self.head) or self.head in self.occupied
+        self.snake.appendleft(self.head)
+        self.occupied[self.head] += 1
+
+        # 2. check if game over
+        # reward metric to improve our AI over time
+        reward = 0
+        if collision or self.is_starving():
+            self.end_reason = "collision" if collision else "starvation"
+            reward -= 10
+            return reward, True, self.score
+
+        # 3. check if snake has eaten the food
+        # if eaten, place new food or else just move
+        if self.head == self.food:
+            self.score += 1
+            reward += 10
+            # no free block is left for the food, the snake has won
+            if len(self.occupied) == self.cells:
+                self.end_reason = "won"
+                return reward, True, self.score
+            self.place_food()
+            if self.loop_detector is not None:
+                self.loop_detector.add_head(self.head)
+                self.loop_detector.clear()
+                self.loop_detector.repeated(self.direction, self.food, len(self.snake))
+        else:
+            tail = self.snake.pop()
+            self.occupied[tail] -= 1
+            if not self.occupied[tail]:
+                del self.occupied[tail]
+
+            # 4. check if the snake is running in a circle
+            if self.loop_detector is not None:
+                self.loop_detector.add_head(self.head)
+                self.loop_detector.remove_tail(tail)
+                if self.loop_detector.repeated(self.direction, self.food, len(self.snake)):
+                    if self.loop_detection == "end":
+                        # cut, not lost : no death penalty
+                        self.end_reason = "loop"
+                        return reward, True, self.score
+                    reward -= LOOP_PENALTY
+
+        return reward, False, self.score
+
+    def is_starving(self):
+        # True if the snake went too long without eating the food
+        return self.starvation_limit is not None and self.frame_iteration > self.starvation_limit * len(self.snake)
+
+class NullRenderer():
+    """
+    renderer of headless games, draws nothing and never waits
+    """
+    def poll_events(self):
+        return []
+
+    def draw(self, game):
+        pass
+
+    def tick(self):
+        pass
+
+class PygameRenderer():
+    """
+    draws a game into a pygame window, at most speed frames per second
+    """
+    def __init__(self, width = 640, height = 480, speed = SPEED):
+        load_pygame()
+        self.speed = speed
+
+        # initialize game window
+        # pygame.display.set_mode(size = (width, height)) : Initialize a window or screen for display
+        self.display = pygame.display.set_mode((width, height))
+        pygame.display.set_caption("Snake Game")
+
+        # pygame.time.Clock() : create an object to help track time.
+        self.clock = pygame.time.Clock()
+
+    def poll_events(self):
+        # returns the pending pygame events, quits on the window close button
+        events = pygame.event.get()
+        for event in events:
+            # pygame.QUIT is equal to when a person clicks on the close button
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        return events
+
+    def draw(self, game):
+        # fill the game display with black color
+        self.display.fill(BLACK)
+
+        # draws snake on screen
+        for pt in game.snake:
+            pygame.draw.rect(self.display, BLUE1, pygame.Rect(pt.x, pt.y, BLOCK_SIZE, BLOCK_SIZE))
+            pygame.draw.rect(self.display, BLUE2, pygame.Rect(pt.x + 4, pt.y + 4, 12, 12))
+
+        # draws food on the screen
+        pygame.draw.rect(self.display, RED, pygame.Rect(game.food.x, game.food.y, BLOCK_SIZE, BLOCK_SIZE))
+
+        # writing score on screen
+        # font.render(text, antialias, color, background = None)
+        # antialias is a boolean argumant, if true the character will have smooth edges
+        text = font.render("Score: " + str(game.score), True, WHITE)
+
+        # blit or overlap the surface on the canvas at the given position
+        # for more information on blit, please go through the below link:
+        # https://stackoverflow.com/questions/37800894/what-is-the-surface-blit-function-in-pygame-what-does-it-do-how-does-it-work
+        # Inshort we are trying to draw whatever is there in text object in the (0,0) position
+        self.display.blit(text, [0,0])
+
+        # updates the components of the entire display
+        pygame.display.flip()
+
+    def tick(self):
+        # SPEED set at 10 fps means the game will never run at more than 10 frames per second
+        self.clock.tick(self.speed)
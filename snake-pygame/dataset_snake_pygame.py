@@ -0,0 +1,178 @@
+# on disk replay dataset
+# transitions are appended to chunk files of bit packed records (see replay_snake_pygame),
+# and read back through memory maps, so a dataset can be much larger than RAM
+# several processes or machines can write into the same folder as long as each one uses its own prefix,
+# process_prefix() gives every process its own
+# usage : python dataset_snake_pygame.py folder [epochs]
+
+import glob
+import os
+import queue
+import socket
+import sys
+import threading
+import numpy as np
+from replay_snake_pygame import TRANSITION_DTYPE, SPILL_BLOCK, encode_transition, decode_transitions
+
+# number of transitions in one chunk file, 1M transitions are 7 MB on disk
+CHUNK_SIZE = 1_000_000
+
+def process_prefix():
+    # chunk file prefix unique to this process : hostname-pid
+    return "{}-{}".format(socket.gethostname(), os.getpid())
+
+class ReplayDatasetWriter():
+    """
+    appends transitions to the chunk files <prefix>_<index>.bin in a folder,
+    continuing the last chunk of an earlier run with the same prefix
+    """
+    def __init__(self, folder, prefix = "chunk", chunk_size = CHUNK_SIZE):
+        """
+        folder : dataset folder, created if it does not exist
+        prefix : file name prefix of the chunks, use one per writing process or machine
+        chunk_size : number of transitions per chunk file
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.folder = folder
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+
+        # transitions are buffered in memory and written in blocks
+        self.buffer = np.zeros(SPILL_BLOCK, dtype = TRANSITION_DTYPE)
+        self.buffered = 0
+
+        # continue after the last chunk written with this prefix
+        chunks = sorted(glob.glob(os.path.join(folder, prefix + "_*.bin")))
+        self.chunk_index = len(chunks) - 1 if chunks else 0
+        self.chunk_records = os.path.getsize(chunks[-1]) // TRANSITION_DTYPE.itemsize if chunks else 0
+
+    def chunk_path(self, index):
+        return os.path.join(self.folder, "{}_{:05d}.bin".format(self.prefix, index))
+
+    def append(self, transition):
+        """
+        transition : (state, action, reward, next_state, done) tuple, as stored by Agent.remember
+        """
+        self.buffer[self.buffered] = encode_transition(*transition)
+        self.buffered += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        # writes the buffered transitions, starting a new chunk whenever the current one is full
+        written = 0
+        while written < self.buffered:
+            if self.chunk_records == self.chunk_size:
+                self.chunk_index += 1
+                self.chunk_records = 0
+
+            count = min(self.buffered - written, self.chunk_size - self.chunk_records)
+            with open(self.chunk_path(self.chunk_index), "ab") as chunk_file:
+                self.buffer[written : written + count].tofile(chunk_file)
+
+            written += count
+            self.chunk_records += count
+
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ReplayDataset():
+    """
+    read only view over every chunk file in a dataset folder
+    with num_shards > 1 only every num_shards'th record of every chunk, starting at shard, is visible,
+    so data parallel workers train on disjoint parts of the same dataset
+    """
+    def __init__(self, folder, shard = 0, num_shards = 1):
+        self.folder = folder
+        # a chunk can be in the middle of a write, only its complete records are mapped
+        self.chunks = []
+        for path in sorted(glob.glob(os.path.join(folder, "*.bin"))):
+            records = os.path.getsize(path) // TRANSITION_DTYPE.itemsize
+            if records > 0:
+                chunk = np.memmap(path, dtype = TRANSITION_DTYPE, mode = "r", shape = (records,))
+                self.chunks.append(chunk[shard::num_shards])
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def batches(self, batch_size, shuffle = True):
+        """
+        yields decoded (states, actions, rewards, next_states, dones) batches, one epoch over the dataset
+        with shuffle, the chunk order and the order inside every chunk are random
+        """
+        chunk_order = np.random.permutation(len(self.chunks)) if shuffle else range(len(self.chunks))
+        for chunk_index in chunk_order:
+            chunk = self.chunks[chunk_index]
+            indices = np.random.permutation(len(chunk)) if shuffle else np.arange(len(chunk))
+            for start in range(0, len(chunk), batch_size):
+                # sorted indices read the memory map front to back
+                batch_indices = np.sort(indices[start : start + batch_size])
+                yield decode_transitions(chunk[batch_indices])
+
+    def iter_batches(self, batch_size, shuffle = True, prefetch = 4):
+        """
+        same as batches(), but the batches are read and decoded by a background thread
+        which stays up to prefetch batches ahead of the training loop
+        """
+        batch_queue = queue.Queue(maxsize = prefetch)
+        end_of_epoch = object()
+        # set when the training loop stops early, so the producer does not block forever on a full queue
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batch_queue.put(item, timeout = 0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for batch in self.batches(batch_size, shuffle):
+                    if not put(batch):
+                        return
+                put(end_of_epoch)
+            except Exception as error:
+                # hand the error over to the training loop instead of dying silently
+                put(error)
+
+        producer = threading.Thread(target = produce, daemon = True)
+        producer.start()
+
+        try:
+            while True:
+                batch = batch_queue.get()
+                if batch is end_of_epoch:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            stop.set()
+            producer.join()
+
+if __name__ == "__main__":
+    from model_snake_pygame import Linear_QNet, QTrainer
+
+    folder = sys.argv[1]
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    dataset = ReplayDataset(folder)
+    print("Transitions ", len(dataset), "Chunks ", len(dataset.chunks))
+
+    model = Linear_QNet(11, 256, 3)
+    trainer = QTrainer(model, learning_rate = 0.001, gamma = 0.9)
+    trainer.train_offline(dataset, batch_size = 1000, epochs = epochs)
+    model.save("model_offline.pth")
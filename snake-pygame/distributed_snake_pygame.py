@@ -0,0 +1,137 @@
+# data parallel learner with torch.distributed on CPU (gloo backend)
+# every worker process trains its own copy of Linear_QNet on its own shard of an on disk replay dataset,
+# the gradients are averaged with an all-reduce before every optimizer step, so all copies stay identical
+# usage on one machine : python distributed_snake_pygame.py folder [worker counts ...]
+#   trains with 1, 2, 4 ... workers on localhost and reports the scaling efficiency
+# usage on several machines : torchrun --nnodes N --nproc-per-node P ... distributed_snake_pygame.py folder
+#   every process reads RANK, WORLD_SIZE, MASTER_ADDR and MASTER_PORT from the environment
+
+import os
+import socket
+import sys
+import time
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from model_snake_pygame import Linear_QNet, QTrainer, worker_cores
+from dataset_snake_pygame import ReplayDataset, ReplayDatasetWriter
+from replay_snake_pygame import STATE_SIZE, ACTION_SIZE
+
+BATCH_SIZE = 1000
+LEARNING_RATE = 0.001
+
+def free_port():
+    # a free localhost port for the process group rendezvous
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def broadcast_parameters(model):
+    # every worker starts from the weights of rank 0
+    for parameter in model.parameters():
+        dist.broadcast(parameter.data, src = 0)
+
+def all_reduce_gradients(model, world_size):
+    # replaces every gradient by its mean over all workers
+    for parameter in model.parameters():
+        if parameter.grad is not None:
+            dist.all_reduce(parameter.grad)
+            parameter.grad /= world_size
+
+def learn(folder, rank, world_size, steps, batch_size = BATCH_SIZE):
+    """
+    training loop of one worker inside an initialized process group
+    returns the model and the number of transitions per second this worker trained on
+    """
+    # one thread per worker, pinned to its own core, workers share the host
+    # the core is chosen by the rank on this host : LOCAL_RANK under torchrun, the global rank under mp.spawn
+    torch.set_num_threads(1)
+    if hasattr(os, "sched_setaffinity"):
+        local_rank = int(os.environ.get("LOCAL_RANK", rank))
+        os.sched_setaffinity(0, worker_cores(local_rank))
+
+    model = Linear_QNet(STATE_SIZE, 256, ACTION_SIZE)
+    broadcast_parameters(model)
+    trainer = QTrainer(model, learning_rate = LEARNING_RATE, gamma = 0.9)
+    trainer.gradient_hook = lambda : all_reduce_gradients(model, world_size)
+
+    dataset = ReplayDataset(folder, shard = rank, num_shards = world_size)
+    if len(dataset) == 0:
+        raise ValueError("no transitions in the shard {} of {} of {}".format(rank, world_size, folder))
+
+    dist.barrier()
+    start = time.perf_counter()
+    step = 0
+    while step < steps:
+        # the dataset is read again from the start once a worker has gone through its shard
+        for states, actions, rewards, next_states, dones in dataset.iter_batches(batch_size):
+            trainer.train_step(states, actions, rewards, next_states, dones)
+            step += 1
+            if step == steps:
+                break
+    dist.barrier()
+
+    return model, steps * batch_size / (time.perf_counter() - start)
+
+def run_worker(rank, world_size, folder, steps, port, results):
+    # entry point of a worker spawned on localhost
+    os.environ["MASTER_ADDR"] = "127.0.0.1"
+    os.environ["MASTER_PORT"] = str(port)
+    dist.init_process_group("gloo", rank = rank, world_size = world_size)
+    try:
+        model, throughput = learn(folder, rank, world_size, steps)
+        results.put((rank, throughput))
+    finally:
+        dist.destroy_process_group()
+
+def train_local(folder, world_size, steps = 50):
+    """
+    trains with world_size worker processes on localhost
+    returns the total number of transitions per second trained on by all workers together
+    """
+    context = mp.get_context("spawn")
+    results = context.SimpleQueue()
+    mp.spawn(run_worker, args = (world_size, folder, steps, free_port(), results), nprocs = world_size)
+    return sum(results.get()[1] for _ in range(world_size))
+
+def scaling_benchmark(folder, worker_counts = (1, 2, 4), steps = 50):
+    """
+    trains with every worker count, the per worker batch size stays the same (weak scaling),
+    so the efficiency is throughput(n) / (n * throughput(1))
+    """
+    baseline = None
+    for world_size in worker_counts:
+        throughput = train_local(folder, world_size, steps)
+        baseline = baseline if baseline is not None else throughput / world_size
+        print("Workers ", world_size, "Transitions/s ", round(throughput),
+              "Efficiency ", "{:.0%}".format(throughput / (world_size * baseline)))
+
+def write_random_dataset(folder, transitions = 200_000):
+    """
+    fills folder with random transitions, only meant for benchmarking the learner without recorded games
+    """
+    with ReplayDatasetWriter(folder, prefix = "random") as writer:
+        for _ in range(transitions):
+            action = [0, 0, 0]
+            action[np.random.randint(ACTION_SIZE)] = 1
+            writer.append((np.random.randint(0, 2, STATE_SIZE), action, np.random.choice([-10, 0, 10]),
+                           np.random.randint(0, 2, STATE_SIZE), np.random.rand() < 0.05))
+
+if __name__ == "__main__":
+    folder = sys.argv[1]
+
+    if "RANK" in os.environ:
+        # launched by torchrun, possibly on several machines
+        dist.init_process_group("gloo")
+        model, throughput = learn(folder, dist.get_rank(), dist.get_world_size(), steps = 50)
+        print("Rank ", dist.get_rank(), "Transitions/s ", round(throughput))
+        if dist.get_rank() == 0:
+            model.save("model_distributed.pth")
+        dist.destroy_process_group()
+    else:
+        if not os.path.exists(folder):
+            print("No dataset at", folder, "writing random transitions for the benchmark")
+            write_random_dataset(folder)
+        worker_counts = [int(count) for count in sys.argv[2:]] or [1, 2, 4]
+        scaling_benchmark(folder, worker_counts)
@@ -0,0 +1,150 @@
+# exports a trained Linear_QNet for CPU inference
+# the float32 model is converted to a dynamically quantized (int8) or bfloat16 variant,
+# traced and frozen into TorchScript, and only saved if it picks the same actions as the float model
+# usage : python export_snake_pygame.py [model.pth]
+
+import copy
+import os
+import sys
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from model_snake_pygame import Linear_QNet
+
+# export modes, "float" is the plain float32 model and serves as the benchmark baseline
+EXPORT_MODES = ["float", "int8", "bf16"]
+
+# smallest fraction of states on which the exported model must agree with the float model
+MIN_AGREEMENT = 0.99
+
+# model parameters, same as in the Agent
+INPUT_SIZE = 11
+HIDDEN_SIZE = 256
+OUTPUT_SIZE = 3
+
+class BFloat16QNet(nn.Module):
+    """
+    runs a Linear_QNet in bfloat16, inputs and outputs stay float32
+    so the exported model is a drop in replacement for the float model
+    """
+    def __init__(self, model):
+        super().__init__()
+        self.model = copy.deepcopy(model).to(torch.bfloat16)
+
+    def forward(self, x):
+        return self.model(x.to(torch.bfloat16)).float()
+
+def all_states(input_size = INPUT_SIZE):
+    """
+    every combination of the binary state features, shape (2 ** input_size, input_size)
+    the agent state is 11 booleans, so this covers every state the model can ever see
+    """
+    bits = np.arange(2 ** input_size)[:, None] >> np.arange(input_size)
+    return torch.tensor(bits & 1, dtype = torch.float)
+
+def quantize_model(model, mode = "int8"):
+    """
+    model : trained float32 Linear_QNet
+    mode : "float", "int8" (dynamic quantization of the linear layers) or "bf16"
+    returns a new eval mode model, the original model is left untouched
+    """
+    model = copy.deepcopy(model).eval()
+
+    if mode == "float":
+        return model
+    if mode == "int8":
+        # weights are stored in int8, activations are quantized on the fly per batch
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype = torch.qint8)
+    if mode == "bf16":
+        return BFloat16QNet(model).eval()
+
+    raise ValueError("unknown export mode : {}, expected one of {}".format(mode, EXPORT_MODES))
+
+def script_model(model, input_size = INPUT_SIZE):
+    """
+    traces the model into TorchScript and freezes it,
+    freezing inlines the weights and lets the JIT fuse linear + relu where the backend supports it
+    """
+    example = torch.zeros(1, input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model.eval(), example)
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+def action_agreement(reference, candidate, states):
+    """
+    fraction of states on which both models pick the same (argmax) action
+    """
+    with torch.no_grad():
+        reference_actions = torch.argmax(reference(states), dim = 1)
+        candidate_actions = torch.argmax(candidate(states), dim = 1)
+    return (reference_actions == candidate_actions).float().mean().item()
+
+def benchmark(model, states, batch_size = 1024, repeats = 200):
+    """
+    model : model to benchmark
+    states : states to run through the model
+    returns the mean latency of a single state forward in microseconds
+    and the batched throughput in states per second
+    """
+    single_states = [state.unsqueeze(0) for state in states[:repeats]]
+    batch = states[:batch_size]
+
+    with torch.no_grad():
+        # warm up, the first calls of a frozen TorchScript model run the optimization passes
+        for _ in range(10):
+            model(single_states[0])
+            model(batch)
+
+        start = time.perf_counter()
+        for state in single_states:
+            model(state)
+        latency = (time.perf_counter() - start) / len(single_states)
+
+        start = time.perf_counter()
+        for _ in range(repeats // 10):
+            model(batch)
+        throughput = len(batch) * (repeats // 10) / (time.perf_counter() - start)
+
+    return {"latency_us" : latency * 1e6, "throughput" : throughput}
+
+def export_model(model, mode = "int8", filename = None, min_agreement = MIN_AGREEMENT):
+    """
+    model : trained float32 Linear_QNet
+    mode : export mode, one of EXPORT_MODES
+    filename : if given, the TorchScript model is saved under ./snake_pygame_models
+    min_agreement : the export fails if the action agreement with the float model is lower
+    returns the TorchScript model and its action agreement rate
+    """
+    states = all_states(model.linear1.in_features)
+    exported = script_model(quantize_model(model, mode), model.linear1.in_features)
+
+    agreement = action_agreement(model.eval(), exported, states)
+    if agreement < min_agreement:
+        raise ValueError("{} export agrees with the float model on {:.2%} of states, "
+                         "below the required {:.2%}".format(mode, agreement, min_agreement))
+
+    if filename is not None:
+        model_folder_path = "./snake_pygame_models"
+        if not os.path.exists(model_folder_path):
+            os.makedirs(model_folder_path)
+        torch.jit.save(exported, os.path.join(model_folder_path, filename))
+
+    return exported, agreement
+
+if __name__ == "__main__":
+    filename = sys.argv[1] if len(sys.argv) > 1 else "model.pth"
+    model = Linear_QNet(INPUT_SIZE, HIDDEN_SIZE, OUTPUT_SIZE).load(filename)
+    states = all_states()
+
+    for mode in EXPORT_MODES:
+        name = os.path.splitext(filename)[0] + "_" + mode + ".pt"
+        try:
+            exported, agreement = export_model(model, mode, name)
+        except ValueError as error:
+            print(mode, ":", error)
+            continue
+
+        results = benchmark(exported, states)
+        print("{:<6} agreement {:7.2%}  latency {:7.1f} us  throughput {:12,.0f} states/s  saved {}".format(
+              mode, agreement, results["latency_us"], results["throughput"], name))
@@ -5,11 +5,14 @@ Created on Mon Jul 26 23:53:56 2021
 @author: P Akash
 """
 
-import matplotlib.pyplot as plt
-from IPython import display
+# matplotlib and IPython are imported inside plot(), so importing this module
+# (and the agent which imports it) stays cheap for headless training workers
 
 
 def plot(scores, mean_scores):
+    import matplotlib.pyplot as plt
+    from IPython import display
+    
     # clear the output of the current cell receiving output
     display.clear_output(wait = True)
     
@@ -0,0 +1,108 @@
+# lookahead action selection
+# before every real move, the game is snapshotted and many short rollouts are simulated from it,
+# the rollouts follow the greedy policy of a Linear_QNet and are bootstrapped with its Q-values,
+# the first action with the best mean return is played
+# usage : python lookahead_snake_pygame.py [number of games] [time budget per move in ms]
+
+import random
+import sys
+import time
+from core_snake_pygame import ACTIONS
+from state_snake_pygame import get_state
+from replay_snake_pygame import pack_states
+from model_snake_pygame import PolicyCache
+
+class LookaheadPlanner():
+    def __init__(self, model = None, depth = 10, time_budget = 0.05, max_rollouts = None,
+                 gamma = 0.9, exploration = 0.1):
+        """
+        model : Linear_QNet guiding the rollouts and valuing their last state, None plays random rollouts
+        depth : number of simulated steps per rollout
+        time_budget : seconds spent simulating per real move
+        max_rollouts : optional cap on the rollouts per real move
+        gamma : discount rate of the simulated rewards
+        exploration : probability of a random move inside a rollout
+        """
+        # the rollouts look actions and values up in a table instead of running the network
+        self.policy = PolicyCache(model) if model is not None else None
+        self.depth = depth
+        self.time_budget = time_budget
+        self.max_rollouts = max_rollouts
+        self.gamma = gamma
+        self.exploration = exploration
+
+        # number of rollouts simulated for the last move
+        self.rollouts = 0
+
+    def rollout(self, game, move):
+        # discounted return of playing move and then following the rollout policy for depth - 1 steps
+        value = 0.0
+        discount = 1.0
+        for _ in range(self.depth):
+            reward, game_over, _ = game.step(game.turn(ACTIONS[move]))
+            value += discount * reward
+            discount *= self.gamma
+            if game_over:
+                return value
+
+            if self.policy is None or random.random() < self.exploration:
+                move = random.randint(0, 2)
+            else:
+                state = pack_states(get_state(game))
+                move = int(self.policy.actions[state])
+
+        # bootstrap the rest of the game with the network value of the last state
+        if self.policy is not None:
+            value += discount * float(self.policy.q_values[pack_states(get_state(game))].max())
+        return value
+
+    def get_action(self, game):
+        """
+        game : the real game, it is not modified
+        returns the [straight, right, left] action with the best mean rollout return
+        """
+        if self.policy is not None and self.policy.actions is None:
+            self.policy.rebuild()
+
+        simulation = game.copy()
+        root = simulation.snapshot()
+
+        totals = [0.0, 0.0, 0.0]
+        counts = [0, 0, 0]
+        deadline = time.perf_counter() + self.time_budget
+        rollouts = 0
+
+        # every first move is tried at least once, then they take turns until the budget is spent
+        while rollouts < 3 or (time.perf_counter() < deadline and
+                               (self.max_rollouts is None or rollouts < self.max_rollouts)):
+            move = rollouts % 3
+            simulation.restore(root)
+            totals[move] += self.rollout(simulation, move)
+            counts[move] += 1
+            rollouts += 1
+
+        self.rollouts = rollouts
+        best = max(range(3), key = lambda move : totals[move] / counts[move])
+        return list(ACTIONS[best])
+
+if __name__ == "__main__":
+    from model_snake_pygame import Linear_QNet
+    from planner_snake_pygame import new_game
+
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    time_budget = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+
+    planner = LookaheadPlanner(Linear_QNet(11, 256, 3).load(), time_budget = time_budget)
+    scores = []
+    rollouts = []
+    for _ in range(number_of_games):
+        game = new_game()
+        while True:
+            _, game_over, score = game.step(game.turn(planner.get_action(game)))
+            rollouts.append(planner.rollouts)
+            if game_over:
+                scores.append(score)
+                break
+
+    print("Mean score ", sum(scores) / len(scores), "Best score ", max(scores),
+          "Rollouts per move ", round(sum(rollouts) / len(rollouts)))
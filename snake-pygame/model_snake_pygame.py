@@ -9,7 +9,102 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
+import copy
 import os
+import time
+import numpy as np
+from replay_snake_pygame import pack_states, unpack_states
+
+# default torch thread settings for every process role
+# actors and evaluators run batch 1 forwards where thread sync costs more than the math,
+# a learner thread count of None is auto tuned on its mini batch size
+ROLE_THREADS = {
+    "actor" : {"num_threads" : 1, "interop_threads" : 1},
+    "evaluator" : {"num_threads" : 1, "interop_threads" : 1},
+    "learner" : {"num_threads" : None, "interop_threads" : 1},
+}
+
+def available_cores():
+    # cores this process is allowed to run on
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def worker_cores(worker_index, threads_per_worker = 1):
+    """
+    cores for the worker_index'th worker when every worker gets threads_per_worker cores,
+    wraps around when there are more workers than cores
+    """
+    cores = available_cores()
+    start = (worker_index * threads_per_worker) % len(cores)
+    return [cores[(start + i) % len(cores)] for i in range(min(threads_per_worker, len(cores)))]
+
+def tune_num_threads(model, batch_size, candidates = None, repeats = 20):
+    """
+    times a forward and backward pass of the given batch size for every candidate thread count
+    and returns the fastest one, the model itself is not modified
+    """
+    if candidates is None:
+        max_threads = len(available_cores())
+        candidates = [n for n in (1, 2, 4, 8, 16) if n <= max_threads]
+    
+    model = copy.deepcopy(model)
+    batch = torch.rand(batch_size, model.linear1.in_features)
+    timings = {}
+    for num_threads in candidates:
+        torch.set_num_threads(num_threads)
+        # warm up the thread pool before timing
+        model(batch).sum().backward()
+        
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.zero_grad()
+            model(batch).sum().backward()
+        timings[num_threads] = time.perf_counter() - start
+    
+    return min(timings, key = timings.get)
+
+def configure_threads(role = "learner", num_threads = None, interop_threads = None, cores = None,
+                      model = None, batch_size = 1000):
+    """
+    role : "actor", "learner" or "evaluator", picks the defaults from ROLE_THREADS
+    num_threads : intra-op threads, defaults to the role setting, tuned on model if still None
+    interop_threads : inter-op threads, defaults to the role setting
+    cores : list of cores to pin this process to, None leaves the affinity alone
+    model, batch_size : workload used to auto tune the learner thread count
+    returns the chosen configuration as a dictionary
+    """
+    if role not in ROLE_THREADS:
+        raise ValueError("unknown role : {}, expected one of {}".format(role, list(ROLE_THREADS)))
+    
+    if cores is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    
+    # the inter-op pool can only be sized once, before any parallel work has started,
+    # so it is set before tune_num_threads() runs the model
+    if interop_threads is None:
+        interop_threads = ROLE_THREADS[role]["interop_threads"]
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        # parallel work already ran in this process, the pool keeps its size
+        interop_threads = torch.get_num_interop_threads()
+    
+    if num_threads is None:
+        num_threads = ROLE_THREADS[role]["num_threads"]
+    if num_threads is None:
+        if model is not None:
+            num_threads = tune_num_threads(model, batch_size)
+        else:
+            num_threads = min(4, len(available_cores()))
+    torch.set_num_threads(num_threads)
+    
+    return {
+        "role" : role,
+        "num_threads" : torch.get_num_threads(),
+        "interop_threads" : interop_threads,
+        "cores" : available_cores(),
+    }
 
 class Linear_QNet(nn.Module):
     """
@@ -33,6 +128,42 @@ class Linear_QNet(nn.Module):
         
         filename = os.path.join(model_folder_path, filename)
         torch.save(self.state_dict(), filename)
+    
+    def load(self, filename = "model.pth"):
+        # loads weights written by save() from the same model folder
+        model_folder_path = "./snake_pygame_models"
+        filename = os.path.join(model_folder_path, filename)
+        self.load_state_dict(torch.load(filename))
+        return self
+        
+class PolicyCache():
+    """
+    greedy policy of a fixed Linear_QNet as a lookup table
+    the state is 11 bits, so the network is evaluated on all 2048 states in one batched forward pass
+    and picking an action becomes a single array index instead of a torch call
+    the table is rebuilt lazily on the next lookup after invalidate(), call it whenever the weights change
+    """
+    def __init__(self, model):
+        self.model = model
+        self.q_values = None # (2048, 3) Q-values of every packed state
+        self.actions = None # (2048,) greedy action index of every packed state
+    
+    def invalidate(self):
+        self.q_values = None
+        self.actions = None
+    
+    def rebuild(self):
+        states = torch.tensor(unpack_states(np.arange(2 ** self.model.linear1.in_features)))
+        with torch.no_grad():
+            q_values = self.model(states)
+        self.q_values = q_values.numpy()
+        self.actions = torch.argmax(q_values, dim = 1).numpy().astype(np.uint8)
+    
+    def action(self, state):
+        # greedy action index for a single unpacked state
+        if self.actions is None:
+            self.rebuild()
+        return int(self.actions[pack_states(state)])
         
 class QTrainer():
     def __init__(self, model, learning_rate, gamma):
@@ -42,6 +173,19 @@ class QTrainer():
         self.optimizer = optim.Adam(model.parameters(), lr = self.learning_rate)
         self.criterion = nn.MSELoss()
         
+        # torch threading settings of this process, set by configure_threads()
+        self.thread_config = None
+        
+        # called between backward() and the optimizer step, e.g. to all-reduce gradients across processes
+        self.gradient_hook = None
+    
+    def configure_threads(self, role = "learner", num_threads = None, interop_threads = None,
+                          cores = None, batch_size = 1000):
+        # sets up torch threads for this process, auto tuning on the trained model
+        self.thread_config = configure_threads(role, num_threads, interop_threads, cores,
+                                               model = self.model, batch_size = batch_size)
+        return self.thread_config
+        
     def train_step(self, current_state, next_action, reward, new_state, done):
         current_state = torch.tensor(current_state, dtype = torch.float)
         next_action = torch.tensor(next_action, dtype = torch.float)
@@ -78,14 +222,59 @@ class QTrainer():
             if not done[idx]:
                 Q_new = reward[idx] + self.gamma * torch.max(self.model(new_state[idx]))
             
-            target[idx][torch.argmax(next_action).item()] = Q_new
+            # the action taken in this sample, not the argmax over the whole batch
+            target[idx][torch.argmax(next_action[idx]).item()] = Q_new
         
         # backpropagation
         # error and loss function
         self.optimizer.zero_grad()
         loss = self.criterion(target, predicted_action)
         loss.backward()
+        if self.gradient_hook is not None:
+            self.gradient_hook()
         self.optimizer.step()
+    
+    def train_offline(self, dataset, batch_size = 1000, epochs = 1, prefetch = 4):
+        """
+        trains on a ReplayDataset without playing any game,
+        the dataset reads and decodes the next mini batches in the background while we train
+        returns the number of training steps taken
+        """
+        steps = 0
+        for epoch in range(epochs):
+            for states, actions, rewards, next_states, dones in dataset.iter_batches(batch_size, prefetch = prefetch):
+                self.train_step(states, actions, rewards, next_states, dones)
+                steps += 1
+            print("Epoch ", epoch + 1, "Steps ", steps)
+        
+        return steps
+    
+    def behavior_cloning(self, dataset, batch_size = 1000, epochs = 1, prefetch = 4):
+        """
+        pretrains the model to pick the recorded actions of a demonstration dataset,
+        the actions of a state are treated as class scores under a cross entropy loss
+        returns the mean loss of the last epoch
+        """
+        criterion = nn.CrossEntropyLoss()
+        mean_loss = 0.0
+        for epoch in range(epochs):
+            total_loss = 0.0
+            steps = 0
+            for states, actions, _, _, _ in dataset.iter_batches(batch_size, prefetch = prefetch):
+                states = torch.tensor(states, dtype = torch.float)
+                labels = torch.tensor(np.argmax(actions, axis = 1))
+                
+                self.optimizer.zero_grad()
+                loss = criterion(self.model(states), labels)
+                loss.backward()
+                self.optimizer.step()
+                
+                total_loss += loss.item()
+                steps += 1
+            mean_loss = total_loss / max(steps, 1)
+            print("Epoch ", epoch + 1, "Behavior cloning loss ", round(mean_loss, 4))
+        
+        return mean_loss
         
         
         
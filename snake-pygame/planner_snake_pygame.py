@@ -0,0 +1,215 @@
+# search based expert policy for the snake game
+# breadth first search to the food on the block grid, taking into account when every body block moves away,
+# the path is only taken if the tail is still reachable after eating, otherwise the snake follows its tail
+# it plays on SnakeCore with the same rules as SnakeGameAI.play_step, so its transitions are valid training data
+# usage : python planner_snake_pygame.py [number of games] [dataset folder]
+
+import sys
+from collections import deque
+from core_snake_pygame import SnakeCore, Direction, BLOCK_SIZE, relative_action
+from session_snake_pygame import SnakeSession, ScriptedController, AgentController, DemonstrationRecorder
+
+# grid step of every direction, in blocks
+MOVES = {
+    Direction.RIGHT : (1, 0),
+    Direction.LEFT : (-1, 0),
+    Direction.UP : (0, -1),
+    Direction.DOWN : (0, 1),
+}
+
+def to_cell(pt):
+    return (pt.x // BLOCK_SIZE, pt.y // BLOCK_SIZE)
+
+class ExpertPlanner():
+    def __init__(self, safety_check = True):
+        """
+        safety_check : only go for the food when the tail stays reachable afterwards
+        """
+        self.safety_check = safety_check
+
+    def next_direction(self, game):
+        columns = game.width // BLOCK_SIZE
+        rows = game.height // BLOCK_SIZE
+        body = [to_cell(pt) for pt in game.snake]
+        food = to_cell(game.food)
+
+        path = self.search(body, food, columns, rows)
+        if path and (not self.safety_check or self.is_safe(body, path, food, columns, rows)):
+            return path[0]
+
+        # no safe path to the food, stay alive by chasing the tail along the longest way
+        return self.survive(body, food, columns, rows, game.direction)
+
+    def next_action(self, game):
+        # the expert move as a [straight, right, left] action
+        return relative_action(game.direction, self.next_direction(game))
+
+    @staticmethod
+    def free_after(body):
+        """
+        number of steps after which every body cell can be entered
+        the block at index i (head is 0) leaves after len(body) - i steps, and the game checks
+        collisions before the tail moves, so its cell is free from step len(body) - i + 1 on
+        """
+        length = len(body)
+        return {cell : length - i + 1 for i, cell in enumerate(body)}
+
+    def search(self, body, target, columns, rows):
+        """
+        breadth first search from the head to the target cell
+        returns the list of directions of a shortest path, or None if the target cannot be reached
+        """
+        blocked = self.free_after(body)
+        start = body[0]
+        parents = {start : None}
+        frontier = deque([(start, 0)])
+
+        while frontier:
+            cell, steps = frontier.popleft()
+            for direction, (dx, dy) in MOVES.items():
+                neighbour = (cell[0] + dx, cell[1] + dy)
+                if neighbour in parents:
+                    continue
+                if not (0 <= neighbour[0] < columns and 0 <= neighbour[1] < rows):
+                    continue
+                # a body cell reached too early is left unvisited, a longer path may still get there in time
+                if blocked.get(neighbour, 0) > steps + 1:
+                    continue
+
+                parents[neighbour] = (cell, direction)
+                if neighbour == target:
+                    return self.path(parents, target)
+                frontier.append((neighbour, steps + 1))
+
+        return None
+
+    @staticmethod
+    def path(parents, target):
+        # walks the search tree back from the target to the head
+        path = []
+        cell = target
+        while parents[cell] is not None:
+            cell, direction = parents[cell]
+            path.append(direction)
+        return path[::-1]
+
+    def follow(self, body, path, food):
+        # body after walking along path, growing by one block on the food
+        body = deque(body)
+        for direction in path:
+            dx, dy = MOVES[direction]
+            head = (body[0][0] + dx, body[0][1] + dy)
+            body.appendleft(head)
+            if head != food:
+                body.pop()
+        return list(body)
+
+    def is_safe(self, body, path, food, columns, rows):
+        # after eating, the head must still find a way to the tail
+        body = self.follow(body, path, food)
+        return self.search(body, body[-1], columns, rows) is not None
+
+    def survive(self, body, food, columns, rows, direction):
+        """
+        picks the move which keeps the tail reachable and is farthest from the food,
+        falling back to the move with the most reachable free cells
+        """
+        blocked = self.free_after(body)
+        best_direction = direction
+        best_score = None
+        for move, (dx, dy) in MOVES.items():
+            head = (body[0][0] + dx, body[0][1] + dy)
+            if not (0 <= head[0] < columns and 0 <= head[1] < rows) or blocked.get(head, 0) > 1:
+                continue
+
+            moved = self.follow(body, [move], food)
+            tail_reachable = len(moved) < 3 or self.search(moved, moved[-1], columns, rows) is not None
+            distance = abs(head[0] - food[0]) + abs(head[1] - food[1])
+            score = (tail_reachable, self.reachable_cells(moved, columns, rows) if not tail_reachable else 0, distance)
+            if best_score is None or score > best_score:
+                best_direction = move
+                best_score = score
+
+        return best_direction
+
+    def reachable_cells(self, body, columns, rows):
+        # number of cells the head can flood into, treating the whole body as a wall
+        occupied = set(body)
+        seen = {body[0]}
+        frontier = [body[0]]
+        while frontier:
+            cell = frontier.pop()
+            for dx, dy in MOVES.values():
+                neighbour = (cell[0] + dx, cell[1] + dy)
+                if neighbour in seen or neighbour in occupied:
+                    continue
+                if 0 <= neighbour[0] < columns and 0 <= neighbour[1] < rows:
+                    seen.add(neighbour)
+                    frontier.append(neighbour)
+        return len(seen)
+
+def new_game(width = 640, height = 480):
+    # headless game with the rules of SnakeGameAI
+    return SnakeCore(width, height, start_length = 2, starvation_limit = 100)
+
+def generate_demonstrations(number_of_games, writer, planner = None):
+    """
+    plays number_of_games expert games headless and appends every step to writer,
+    anything with append(transition) works: a ReplayDatasetWriter, Agent.memory or a CompactReplayMemory
+    the expert can fill the whole board, such a game ends as "won" like any other game over
+    returns the scores of the games
+    """
+    planner = planner if planner is not None else ExpertPlanner()
+    recorder = DemonstrationRecorder(writer)
+    return [SnakeSession(new_game(), ScriptedController(planner.next_direction), None, recorder).play_game()
+            for _ in range(number_of_games)]
+
+def check_full_board(number_of_games = 20, width = 80, height = 80, max_steps = 10_000):
+    """
+    plays expert games on a small board, where the snake often fills every block,
+    and checks that each one ends by itself, returns the number of games won
+    bulk generation of demonstrations runs unattended, a game that never ends would stall it
+    """
+    planner = ExpertPlanner()
+    won = 0
+    for _ in range(number_of_games):
+        game = new_game(width, height)
+        for _ in range(max_steps):
+            _, game_over, _ = game.step(planner.next_direction(game))
+            if game_over:
+                break
+        if not game_over:
+            raise RuntimeError("expert game on a {} x {} board did not end in {} steps".format(width, height, max_steps))
+        won += game.end_reason == "won"
+    if not won:
+        raise RuntimeError("the expert never filled the {} x {} board in {} games".format(width, height, number_of_games))
+    return won
+
+def evaluate(controller, number_of_games = 100):
+    """
+    controller : ScriptedController, AgentController, ... playing headless games
+    returns the mean and the best score
+    """
+    scores = [SnakeSession(new_game(), controller).play_game() for _ in range(number_of_games)]
+    return sum(scores) / len(scores), max(scores)
+
+if __name__ == "__main__":
+    from agent_snake_pygame import Agent
+
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    planner = ExpertPlanner()
+    print("Full board check, games won ", check_full_board())
+
+    if len(sys.argv) > 2:
+        from dataset_snake_pygame import ReplayDatasetWriter
+        with ReplayDatasetWriter(sys.argv[2], prefix = "expert") as writer:
+            scores = generate_demonstrations(number_of_games, writer, planner)
+        print("Recorded ", number_of_games, "expert games, mean score ", sum(scores) / len(scores))
+
+    # the expert is the ceiling the learned policy is compared against
+    agent = Agent(policy_cache = True)
+    agent.load_model()
+    agent.exploration_games = 0
+
+    print("Expert      mean score, best score ", evaluate(ScriptedController(planner.next_direction), number_of_games))
+    print("Linear_QNet mean score, best score ", evaluate(AgentController(agent), number_of_games))
@@ -0,0 +1,178 @@
+# compact replay memory for the agent
+# a transition from Agent.remember is stored in 7 bytes instead of several hundred:
+# the 11 boolean state features are bit packed into a uint16, the one hot action becomes a uint8 index,
+# the reward an int8 and the done flag a uint8
+
+import numpy as np
+
+# number of binary features in the agent state
+STATE_SIZE = 11
+
+# number of possible actions, [straight, right, left]
+ACTION_SIZE = 3
+
+# one stored transition
+TRANSITION_DTYPE = np.dtype([
+    ("state", np.uint16),
+    ("next_state", np.uint16),
+    ("action", np.uint8),
+    ("reward", np.int8),
+    ("done", np.uint8),
+])
+
+# bit position of every state feature inside the packed uint16
+STATE_SHIFTS = np.arange(STATE_SIZE, dtype = np.uint16)
+
+# evicted transitions are written to the spill file in blocks of this many records
+SPILL_BLOCK = 4096
+
+# symmetries of the board as index permutations of the state features and of the actions
+# state : [danger straight, danger right, danger left, direction left, direction right, direction up,
+#          direction down, food left, food right, food up, food down]
+# action : [straight, right, left]
+# a mirror image turns right turns into left turns, so danger right / left and the right / left actions swap,
+# rotating by 90 degrees is not a symmetry because the 640 x 480 board is not square
+SYMMETRIES = {
+    # left <-> right
+    "mirror_x" : ([0, 2, 1, 4, 3, 5, 6, 8, 7, 9, 10], [0, 2, 1]),
+    # up <-> down
+    "mirror_y" : ([0, 2, 1, 3, 4, 6, 5, 7, 8, 10, 9], [0, 2, 1]),
+    # both mirrors, turns keep their side
+    "rotate_180" : ([0, 1, 2, 4, 3, 6, 5, 8, 7, 10, 9], [0, 1, 2]),
+}
+
+def pack_states(states):
+    """
+    states : one state of shape (11,) or a batch of shape (n, 11) with 0 / 1 values
+    returns a uint16 (or an array of uint16) with feature i stored in bit i
+    """
+    states = np.asarray(states, dtype = np.uint16)
+    return np.bitwise_or.reduce(states << STATE_SHIFTS, axis = -1).astype(np.uint16)
+
+def unpack_states(packed):
+    """
+    packed : uint16 or array of uint16 written by pack_states
+    returns the float32 states, shape (..., 11)
+    """
+    packed = np.asarray(packed, dtype = np.uint16)
+    return ((packed[..., None] >> STATE_SHIFTS) & 1).astype(np.float32)
+
+def encode_transition(state, action, reward, next_state, done):
+    # packs a single transition in the format of Agent.remember into one record
+    record = np.zeros((), dtype = TRANSITION_DTYPE)
+    record["state"] = pack_states(state)
+    record["next_state"] = pack_states(next_state)
+    record["action"] = np.argmax(action)
+    record["reward"] = reward
+    record["done"] = done
+    return record
+
+def decode_transitions(records):
+    """
+    records : array of TRANSITION_DTYPE records
+    returns states, actions, rewards, next_states, dones as float32 arrays (dones as bool),
+    in the same order and layout QTrainer.train_step expects for a batch
+    """
+    states = unpack_states(records["state"])
+    actions = np.eye(ACTION_SIZE, dtype = np.float32)[records["action"]]
+    rewards = records["reward"].astype(np.float32)
+    next_states = unpack_states(records["next_state"])
+    dones = records["done"].astype(bool)
+    return states, actions, rewards, next_states, dones
+
+# the same permutations on packed states, one lookup table of all 2048 states per symmetry
+PACKED_SYMMETRIES = {}
+
+def augment_batch(states, actions, rewards, next_states, dones, symmetries = tuple(SYMMETRIES)):
+    """
+    decoded batch followed by its mirrored / rotated copies, len(symmetries) + 1 times the batch size
+    all permutations here are their own inverse, so the same index lists transform and restore
+    """
+    states = np.asarray(states, dtype = np.float32)
+    actions = np.asarray(actions, dtype = np.float32)
+    rewards = np.asarray(rewards, dtype = np.float32)
+    next_states = np.asarray(next_states, dtype = np.float32)
+    dones = np.asarray(dones, dtype = bool)
+
+    parts = [(states, actions, rewards, next_states, dones)]
+    for name in symmetries:
+        state_index, action_index = SYMMETRIES[name]
+        parts.append((states[:, state_index], actions[:, action_index], rewards, next_states[:, state_index], dones))
+
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+def augment_records(records, symmetries = tuple(SYMMETRIES)):
+    # same as augment_batch() on packed records, every transform is a table lookup
+    if not PACKED_SYMMETRIES:
+        all_states = unpack_states(np.arange(2 ** STATE_SIZE))
+        for name, (state_index, _) in SYMMETRIES.items():
+            PACKED_SYMMETRIES[name] = pack_states(all_states[:, state_index])
+
+    parts = [records]
+    for name in symmetries:
+        transformed = records.copy()
+        transformed["state"] = PACKED_SYMMETRIES[name][records["state"]]
+        transformed["next_state"] = PACKED_SYMMETRIES[name][records["next_state"]]
+        transformed["action"] = np.asarray(SYMMETRIES[name][1], dtype = np.uint8)[records["action"]]
+        parts.append(transformed)
+
+    return np.concatenate(parts)
+
+def load_spill(path):
+    # memory maps a spill file written by CompactReplayMemory, the records are not read into RAM
+    return np.memmap(path, dtype = TRANSITION_DTYPE, mode = "r")
+
+class CompactReplayMemory():
+    """
+    fixed size ring buffer of bit packed transitions, a drop in replacement for the agent's deque
+    when full, the oldest transitions are overwritten, or first appended to spill_path if given
+    """
+    def __init__(self, capacity, spill_path = None):
+        """
+        capacity : number of transitions kept in RAM
+        spill_path : file the evicted transitions are appended to, None drops them
+        """
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.buffer = np.zeros(capacity, dtype = TRANSITION_DTYPE)
+
+        # number of valid records and the index the next record is written to
+        self.size = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        # bytes held in RAM by the buffer
+        return self.buffer.nbytes
+
+    def append(self, transition):
+        """
+        transition : (state, action, reward, next_state, done) tuple, as stored by Agent.remember
+        """
+        # before overwriting a block of the oldest records for the first time, spill it to disk
+        if self.size == self.capacity and self.spill_path is not None and self.position % SPILL_BLOCK == 0:
+            block = self.buffer[self.position : self.position + SPILL_BLOCK]
+            with open(self.spill_path, "ab") as spill_file:
+                block.tofile(spill_file)
+
+        self.buffer[self.position] = encode_transition(*transition)
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample_records(self, batch_size):
+        """
+        returns batch_size random packed records, or every record
+        while the memory holds fewer than batch_size of them
+        indices are drawn with replacement, so sampling stays O(batch_size) for huge buffers
+        """
+        if self.size > batch_size:
+            indices = np.random.randint(0, self.size, batch_size)
+            return self.buffer[indices]
+        return self.buffer[:self.size]
+
+    def sample(self, batch_size):
+        # same as sample_records(), decoded into a training batch
+        return decode_transitions(self.sample_records(batch_size))
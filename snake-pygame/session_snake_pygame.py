@@ -0,0 +1,111 @@
+# a session plugs a controller (keyboard, agent or scripted) and a renderer into the game core
+# and can record every step as a transition in the agent's state / action format,
+# human demonstrations recorded this way pretrain Linear_QNet by behavior cloning
+
+from core_snake_pygame import NullRenderer, load_pygame, relative_action
+from core_snake_pygame import Direction
+from state_snake_pygame import get_state
+
+class KeyboardController():
+    """
+    arrow keys set the direction, without a key press the snake keeps going
+    """
+    def __init__(self):
+        pygame = load_pygame()
+        self.key_directions = {
+            pygame.K_LEFT : Direction.LEFT,
+            pygame.K_RIGHT : Direction.RIGHT,
+            pygame.K_UP : Direction.UP,
+            pygame.K_DOWN : Direction.DOWN,
+        }
+        self.keydown = pygame.KEYDOWN
+
+    def next_direction(self, game, events):
+        direction = game.direction
+        for event in events:
+            # pygame.KEYDOWN is to check is any key is pressed down
+            if event.type == self.keydown and event.key in self.key_directions:
+                direction = self.key_directions[event.key]
+        return direction
+
+class AgentController():
+    """
+    lets an agent (Agent or TabularAgent) steer the snake with its relative actions
+    """
+    def __init__(self, agent):
+        self.agent = agent
+
+    def next_direction(self, game, events):
+        state = self.agent.get_state(game)
+        return game.turn(self.agent.get_action(state))
+
+class ScriptedController():
+    """
+    policy : function of the game returning either a Direction or a [straight, right, left] action
+    """
+    def __init__(self, policy):
+        self.policy = policy
+
+    def next_direction(self, game, events):
+        move = self.policy(game)
+        if isinstance(move, Direction):
+            return move
+        return game.turn(move)
+
+class DemonstrationRecorder():
+    """
+    turns the steps of a session into (state, action, reward, next_state, done) transitions
+    writer : anything with append(transition), e.g. a ReplayDatasetWriter or the agent's memory
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self.transitions = 0
+
+    def record(self, state, direction, new_direction, reward, next_state, done):
+        action = relative_action(direction, new_direction)
+        # a human can reverse into the snake's own neck, the agent has no such action, so it is skipped
+        if action is None:
+            return
+        self.writer.append((state, action, reward, next_state, done))
+        self.transitions += 1
+
+class SnakeSession():
+    """
+    game : SnakeCore
+    controller : picks the direction of every step
+    renderer : PygameRenderer to play in a window, None runs headless
+    recorder : optional DemonstrationRecorder
+    """
+    def __init__(self, game, controller, renderer = None, recorder = None):
+        self.game = game
+        self.controller = controller
+        self.renderer = renderer if renderer is not None else NullRenderer()
+        self.recorder = recorder
+
+    def play_step(self):
+        # returns reward, game_over, score of one step
+        events = self.renderer.poll_events()
+
+        direction = self.game.direction
+        state = get_state(self.game) if self.recorder is not None else None
+
+        reward, game_over, score = self.game.step(self.controller.next_direction(self.game, events))
+
+        if self.recorder is not None:
+            # a game cut by loop detection is not lost, its last state is recorded as not done
+            done = game_over and not self.game.truncated
+            self.recorder.record(state, direction, self.game.direction, reward, get_state(self.game), done)
+
+        if not game_over:
+            self.renderer.draw(self.game)
+            self.renderer.tick()
+
+        return reward, game_over, score
+
+    def play_game(self):
+        # plays one game from the current game state and returns the final score
+        self.renderer.draw(self.game)
+        while True:
+            _, game_over, score = self.play_step()
+            if game_over:
+                return score
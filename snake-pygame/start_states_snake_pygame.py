@@ -0,0 +1,138 @@
+# library of game positions to start training games from
+# every game starting with a 2 block snake in the middle spends most steps on the easy early game,
+# so snapshots of long snakes and of the last moves before a collision are kept and SnakeCore.reset()
+# starts some games from them, weighted by the length of the snake and how close it was to dying
+# usage : python start_states_snake_pygame.py [number of expert games] [library file]
+#   fills a library from expert games and saves it, train(start_states = ...) can load it
+
+import random
+import sys
+from collections import deque, Counter
+import numpy as np
+from core_snake_pygame import GameState, Point, Direction
+
+class StartStateLibrary():
+    def __init__(self, capacity = 5000, start_probability = 0.5, interval = 10, min_length = 6,
+                 length_power = 1.0, hard_snapshots = 3, hard_weight = 4.0):
+        """
+        capacity : number of snapshots kept, the oldest one is replaced when the library is full
+        start_probability : probability that reset() starts from a snapshot instead of the start position
+        interval : record() keeps one snapshot every interval steps
+        min_length : shorter snakes are not worth a snapshot, the fresh games cover them
+        length_power : sampling weight of a snapshot is len(snake) ** length_power
+        hard_snapshots : number of snapshots before the end of a game that count as hard positions
+        hard_weight : the weight of hard positions is multiplied by hard_weight
+        """
+        self.capacity = capacity
+        self.start_probability = start_probability
+        self.interval = interval
+        self.min_length = min_length
+        self.length_power = length_power
+        self.hard_snapshots = hard_snapshots
+        self.hard_weight = hard_weight
+
+        # ring buffer of snapshots and their sampling weights
+        self.states = [None] * capacity
+        self.weights = np.zeros(capacity)
+        self.position = 0
+        self.size = 0
+
+        # snapshots of the running game, held back until it is known if the game ended soon after them
+        self.recent = deque()
+        self.steps = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, hard = False, weight = None):
+        # stores a GameState, the body is shared with the game it came from until that game moves
+        if weight is None:
+            weight = len(state.snake) ** self.length_power * (self.hard_weight if hard else 1.0)
+        self.states[self.position] = state._replace(frame_iteration = 0, loop_detector = None)
+        self.weights[self.position] = weight
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def record(self, game):
+        """
+        called after every step of a game that is not over,
+        keeps a snapshot every interval steps once the snake is min_length blocks long
+        """
+        self.steps += 1
+        if self.steps % self.interval or len(game.snake) < self.min_length:
+            return
+
+        # snapshot() is O(1), the game copies its body on the next move
+        self.recent.append(game.snapshot())
+        if len(self.recent) > self.hard_snapshots:
+            self.add(self.recent.popleft())
+
+    def end_episode(self, end_reason = None):
+        # the last snapshots before a collision are the positions the agent dies from
+        hard = end_reason == "collision"
+        while self.recent:
+            self.add(self.recent.popleft(), hard)
+        self.steps = 0
+
+    def sample(self):
+        # GameState to start the next game from, or None to start from the start position
+        if not self.size or random.random() >= self.start_probability:
+            return None
+        weights = self.weights[:self.size]
+        return self.states[np.random.choice(self.size, p = weights / weights.sum())]
+
+    def save(self, path):
+        # the snapshots as arrays in a .npz file, the bodies are concatenated head first
+        states = self.states[:self.size]
+        np.savez_compressed(path,
+                            cells = np.array([pt for state in states for pt in state.snake], dtype = np.int16).reshape(-1, 2),
+                            lengths = np.array([len(state.snake) for state in states], dtype = np.int32),
+                            directions = np.array([state.direction.value for state in states], dtype = np.int8),
+                            foods = np.array([state.food for state in states], dtype = np.int16).reshape(-1, 2),
+                            scores = np.array([state.score for state in states], dtype = np.int32),
+                            weights = self.weights[:self.size])
+
+    def load(self, path):
+        # adds the snapshots of a file written by save() to the library
+        with np.load(path) as data:
+            cells = data["cells"].tolist()
+            columns = [data[name].tolist() for name in ("lengths", "directions", "foods", "scores", "weights")]
+
+        start = 0
+        for length, direction, food, score, weight in zip(*columns):
+            snake = deque(Point(x, y) for x, y in cells[start : start + length])
+            start += length
+            self.add(GameState(snake, Counter(snake), snake[0], Direction(direction), Point(*food), score, 0, None),
+                     weight = weight)
+        return self
+
+def record_expert_games(library, number_of_games, max_steps = 5000):
+    """
+    fills the library with snapshots of expert games, they reach lengths the agent does not get to on its own
+    expert games can run for a very long time, each one is cut after max_steps steps,
+    a game where the snake fills the board ends by itself as "won"
+    """
+    from planner_snake_pygame import ExpertPlanner, new_game
+
+    planner = ExpertPlanner()
+    for _ in range(number_of_games):
+        game = new_game()
+        end_reason = None
+        for _ in range(max_steps):
+            _, game_over, _ = game.step(planner.next_direction(game))
+            if game_over:
+                end_reason = game.end_reason
+                break
+            library.record(game)
+        library.end_episode(end_reason)
+    return library
+
+if __name__ == "__main__":
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    path = sys.argv[2] if len(sys.argv) > 2 else "start_states.npz"
+
+    library = record_expert_games(StartStateLibrary(), number_of_games)
+    library.save(path)
+    lengths = [len(state.snake) for state in library.states[:len(library)]]
+    print("Saved ", len(library), "start states to", path, "mean length ", sum(lengths) / max(len(lengths), 1),
+          "longest ", max(lengths, default = 0))
@@ -0,0 +1,73 @@
+# measures how long a freshly spawned headless worker process takes to get ready,
+# every worker pays this cost again, so we keep a budget for each entry point
+# usage : python startup_snake_pygame.py [repeats]
+
+import os
+import subprocess
+import sys
+
+# folder of this script, the worker processes are started from here so the game modules import
+SCRIPT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# startup budgets in seconds for a worker, measured as the median over a few fresh interpreters
+# name : (setup code, budget in seconds)
+STARTUP_BUDGETS = {
+    "headless game" : ("from snake_pygame_ai import SnakeGameAI\n"
+                       "SnakeGameAI(render = False)", 0.5),
+    "headless agent" : ("from agent_snake_pygame import Agent\n"
+                        "from snake_pygame_ai import SnakeGameAI\n"
+                        "Agent().get_state(SnakeGameAI(render = False))", 5.0),
+}
+
+# modules which must never be loaded by a headless worker
+HEAVY_MODULES = ["pygame", "matplotlib", "IPython"]
+
+# code run inside the worker, prints the setup time and the heavy modules it ended up loading
+WORKER_TEMPLATE = """
+import sys, time
+start = time.perf_counter()
+{setup}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed)
+print(",".join(loaded))
+"""
+
+def measure_startup(setup, repeats = 5):
+    """
+    setup : python code to run in a fresh interpreter
+    repeats : number of fresh interpreters to spawn
+    returns the median setup time in seconds and the heavy modules loaded by the setup
+    """
+    code = WORKER_TEMPLATE.format(setup = setup, heavy = HEAVY_MODULES)
+    timings = []
+    loaded = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code], cwd = SCRIPT_FOLDER,
+                                capture_output = True, text = True, check = True).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = [name for name in output[1].split(",") if name] if len(output) > 1 else []
+
+    timings.sort()
+    return timings[len(timings) // 2], loaded
+
+def check_budgets(repeats = 5):
+    """
+    measures every entry point in STARTUP_BUDGETS and prints a report,
+    returns True if all of them are within budget and load no heavy module
+    """
+    within_budget = True
+    for name, (setup, budget) in STARTUP_BUDGETS.items():
+        elapsed, loaded = measure_startup(setup, repeats)
+        ok = elapsed <= budget and not loaded
+        within_budget = within_budget and ok
+
+        print("{:<16} {:7.3f}s  budget {:5.2f}s  {}".format(name, elapsed, budget, "ok" if ok else "OVER"))
+        if loaded:
+            print("    loaded heavy modules :", ", ".join(loaded))
+
+    return within_budget
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sys.exit(0 if check_budgets(repeats) else 1)
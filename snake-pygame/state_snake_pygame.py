@@ -0,0 +1,81 @@
+# state features shared by every agent, kept free of torch so table based agents
+# and headless tools can compute states without loading the neural network stack
+
+import numpy as np
+from core_snake_pygame import Direction
+from core_snake_pygame import Point
+from core_snake_pygame import BLOCK_SIZE
+
+def get_state(game):
+    """
+    game : any snake game exposing snake, head, direction, food and is_collision()
+    returns the 11 binary state features the agents learn on
+    """
+    # current head position of snake in the game
+    head = game.snake[0]
+    
+    # current 4 coordinates next to snake head
+    point_left_of_head = Point(head.x - BLOCK_SIZE, head.y)
+    point_right_of_head = Point(head.x + BLOCK_SIZE, head.y)
+    point_up_of_head = Point(head.x, head.y - BLOCK_SIZE)
+    point_down_of_head = Point(head.x, head.y + BLOCK_SIZE)
+    
+    # current snake head direction
+    direction_left = game.direction == Direction.LEFT
+    direction_right = game.direction == Direction.RIGHT
+    direction_up = game.direction == Direction.UP
+    direction_down = game.direction == Direction.DOWN
+    
+    # state values = [danger straight, danger right, danger left,
+    #                 direction_left, direction_right, direction_up, direction_down,
+    #                 food_left, food_right, food_up, food_down]
+    
+    state = [
+            # Danger Straight
+            # check if snake direction is right and collision point is also at right
+            (direction_right and game.is_collision(point_right_of_head)) or
+            # check if snake direction is left and collision point is also at left
+            (direction_left and game.is_collision(point_left_of_head)) or
+            # check if snake direction is up and collision point is also at up
+            (direction_up and game.is_collision(point_up_of_head)) or
+            # check if snake direction is down and collision point is also at down
+            (direction_down and game.is_collision(point_down_of_head)),
+            
+            # Danger Right
+            # check if snake direction is up and collision point is at right
+            (direction_up and game.is_collision(point_right_of_head)) or
+            # check if snake direction is down and collision point is at left
+            (direction_down and game.is_collision(point_left_of_head)) or
+            # check if snake direction is left and collision point is at up
+            (direction_left and game.is_collision(point_up_of_head)) or
+            # check if snake direction is right and collision point is at down
+            (direction_right and game.is_collision(point_down_of_head)),
+            
+            # Danger left
+            # check if snake direction is up and collision point is at right
+            (direction_down and game.is_collision(point_right_of_head)) or
+            # check if snake direction is down and collision point is at left
+            (direction_up and game.is_collision(point_left_of_head)) or
+            # check if snake direction is left and collision point is at up
+            (direction_right and game.is_collision(point_up_of_head)) or
+            # check if snake direction is right and collision point is at down
+            (direction_left and game.is_collision(point_down_of_head)),
+            
+            # current direction of the snake
+            direction_left, 
+            direction_right, 
+            direction_up, 
+            direction_down,
+            
+            # Food location
+            # food is present at left direction of snake's head
+            game.food.x < game.head.x,
+            # food is present at right direction of snake's head
+            game.food.x > game.head.x,
+            # food is present at up direction of snake's head
+            game.food.y < game.head.y,
+            # food is present at down direction of snake's head
+            game.food.y > game.head.y
+            ]
+    
+    return np.array(state, dtype = int)
@@ -0,0 +1,150 @@
+# exact tabular Q-learning on the 11 binary state features
+# the bit packed state (see replay_snake_pygame) indexes a dense (2048, 3) Q-table,
+# so acting is one array lookup and a replay batch is updated with a handful of numpy operations
+# torch is only imported when the table is distilled into a Linear_QNet
+# usage : python tabular_snake_pygame.py [number of games]
+
+import random
+import sys
+import numpy as np
+from snake_pygame_ai import SnakeGameAI
+from state_snake_pygame import get_state
+from replay_snake_pygame import STATE_SIZE, ACTION_SIZE, CompactReplayMemory, pack_states, unpack_states
+from replay_snake_pygame import augment_records
+
+MAX_MEMORY = 100_000
+BATCH_SIZE = 1000
+LEARNING_RATE = 0.1
+
+class TabularAgent():
+    def __init__(self, learning_rate = LEARNING_RATE, gamma = 0.9, memory_size = MAX_MEMORY, augment = False):
+        """
+        augment : also update on the mirrored and rotated copies of every replayed transition
+        """
+        self.number_of_games = 0
+        self.epsilon = 0 # randomness parameter
+        self.gamma = gamma # discount rate, must be smaller than 1
+        self.learning_rate = learning_rate
+        self.augment = augment
+        self.memory = CompactReplayMemory(memory_size)
+
+        # one row of action values per packed state, and how often every state was updated
+        self.q_table = np.zeros((2 ** STATE_SIZE, ACTION_SIZE), dtype = np.float32)
+        self.visits = np.zeros(2 ** STATE_SIZE, dtype = np.int64)
+
+    def get_state(self, game):
+        return get_state(game)
+
+    def remember(self, state, action, reward, next_state, done):
+        self.memory.append((state, action, reward, next_state, done))
+
+    def update(self, states, actions, rewards, next_states, dones):
+        """
+        one Q-learning update over a batch
+        states, next_states : packed states, actions : action indices
+        Q(s, a) += learning_rate * (reward + gamma * max Q(s') - Q(s, a)), without the max term when done
+        """
+        states = np.asarray(states, dtype = np.intp)
+        actions = np.asarray(actions, dtype = np.intp)
+        next_values = self.q_table[np.asarray(next_states, dtype = np.intp)].max(axis = 1)
+        targets = rewards + self.gamma * next_values * (1 - np.asarray(dones, dtype = np.float32))
+
+        errors = targets - self.q_table[states, actions]
+
+        # a batch often holds the same (state, action) pair many times, summing their updates would overshoot,
+        # so every pair moves by the mean of its errors
+        pairs = states * ACTION_SIZE + actions
+        error_sums = np.bincount(pairs, weights = errors, minlength = self.q_table.size)
+        counts = np.bincount(pairs, minlength = self.q_table.size)
+        updated = counts > 0
+        self.q_table.reshape(-1)[updated] += self.learning_rate * error_sums[updated] / counts[updated]
+        self.visits += np.bincount(states, minlength = len(self.visits))
+
+    def train_long_memory(self):
+        records = self.memory.sample_records(BATCH_SIZE)
+        if self.augment:
+            records = augment_records(records)
+        self.update(records["state"], records["action"], records["reward"].astype(np.float32),
+                    records["next_state"], records["done"])
+
+    def train_short_memory(self, state, action, reward, next_state, done):
+        self.update([pack_states(state)], [np.argmax(action)], np.float32([reward]),
+                    [pack_states(next_state)], [done])
+
+    def get_action(self, state):
+        # same exploration schedule as the neural network agent
+        self.epsilon = 80 - self.number_of_games
+        next_action = [0, 0, 0]
+
+        if random.randint(0, 200) < self.epsilon:
+            move = random.randint(0, 2)
+        else:
+            move = int(np.argmax(self.q_table[pack_states(state)]))
+
+        next_action[move] = 1
+        return next_action
+
+    def export_table(self):
+        # copy of the Q-table and the mask of states that were actually visited
+        return self.q_table.copy(), self.visits > 0
+
+def distill_into(model, q_table, visited, epochs = 500, learning_rate = 0.001):
+    """
+    fits a Linear_QNet to the Q-values of the visited states of a table,
+    the distilled network can seed the neural network agent instead of random weights
+    returns the final mean squared error
+    """
+    import torch
+
+    states = torch.tensor(unpack_states(np.flatnonzero(visited)))
+    targets = torch.tensor(q_table[visited])
+
+    optimizer = torch.optim.Adam(model.parameters(), lr = learning_rate)
+    criterion = torch.nn.MSELoss()
+    for _ in range(epochs):
+        optimizer.zero_grad()
+        loss = criterion(model(states), targets)
+        loss.backward()
+        optimizer.step()
+
+    return loss.item()
+
+def train_tabular(number_of_games = 1000, render = False):
+    agent = TabularAgent()
+    game = SnakeGameAI(render = render)
+    total_score = 0
+    best_score = 0
+
+    while agent.number_of_games < number_of_games:
+        current_state = agent.get_state(game)
+        next_action = agent.get_action(current_state)
+        reward, done, score = game.play_step(next_action)
+        new_state = agent.get_state(game)
+
+        agent.train_short_memory(current_state, next_action, reward, new_state, done)
+        agent.remember(current_state, next_action, reward, new_state, done)
+
+        if done:
+            game.reset()
+            agent.number_of_games += 1
+            agent.train_long_memory()
+
+            best_score = max(best_score, score)
+            total_score += score
+            print("Game ", agent.number_of_games, "Score ", score, "Best Score ", best_score,
+                  "Mean Score ", round(total_score / agent.number_of_games, 2))
+
+    return agent
+
+if __name__ == "__main__":
+    from model_snake_pygame import Linear_QNet
+
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    agent = train_tabular(number_of_games)
+
+    q_table, visited = agent.export_table()
+    print("Visited states ", int(visited.sum()), "of", len(visited))
+
+    model = Linear_QNet(STATE_SIZE, 256, ACTION_SIZE)
+    print("Distillation loss ", distill_into(model, q_table, visited))
+    model.save("model_tabular.pth")
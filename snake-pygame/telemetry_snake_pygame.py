@@ -0,0 +1,180 @@
+# live telemetry of a training run
+# TrainingTelemetry counts what the training loop does and serves it in the Prometheus text format
+# from a background thread, e.g. curl http://127.0.0.1:8000/metrics
+
+import math
+import sys
+import threading
+import time
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# env and train steps per second are averaged over this many seconds
+RATE_WINDOW = 60
+
+def replay_memory_bytes(memory):
+    """
+    bytes held by a replay memory, exact for a CompactReplayMemory,
+    estimated from the first transition for the agent's deque of tuples
+    """
+    if hasattr(memory, "nbytes"):
+        return memory.nbytes
+    if not len(memory):
+        return 0
+    transition = memory[0]
+    size = sys.getsizeof(transition) + sum(getattr(item, "nbytes", 0) + sys.getsizeof(item) for item in transition)
+    return size * len(memory)
+
+class TrainingTelemetry():
+    def __init__(self, window = 100):
+        """
+        window : number of recent games the rolling mean score is taken over
+        """
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+
+        self.env_steps = 0
+        self.train_steps = 0
+        # games, recent scores and end reasons by how the game started : "fresh" or "resumed" from a start state
+        self.window = window
+        self.games = defaultdict(int, fresh = 0)
+        self.scores = defaultdict(lambda : deque(maxlen = window))
+
+        self.replay_size = 0
+        self.replay_capacity = 0
+        self.replay_bytes = 0
+
+        self.last_checkpoint = None
+        self.phase_seconds = defaultdict(float)
+        self.end_reasons = defaultdict(int)
+        self.thread_config = None
+
+        # (time, env_steps, train_steps) samples, at most one per second, for the step rates
+        self.rate_samples = deque([(time.monotonic(), 0, 0)])
+        self.server = None
+
+    @contextmanager
+    def phase(self, name):
+        # adds the time spent inside the with block to the phase
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.phase_seconds[name] += elapsed
+
+    def record_steps(self, env_steps = 0, train_steps = 0):
+        with self.lock:
+            self.env_steps += env_steps
+            self.train_steps += train_steps
+
+            now = time.monotonic()
+            if now - self.rate_samples[-1][0] >= 1:
+                self.rate_samples.append((now, self.env_steps, self.train_steps))
+                while now - self.rate_samples[0][0] > RATE_WINDOW:
+                    self.rate_samples.popleft()
+
+    def record_game(self, score, end_reason = None, start = "fresh"):
+        """
+        start : "fresh" for a game from the start position, "resumed" for one started from a StartStateLibrary
+                snapshot, whose score includes the food eaten before the snapshot
+        """
+        with self.lock:
+            self.games[start] += 1
+            self.scores[start].append(score)
+            if end_reason is not None:
+                self.end_reasons[(end_reason, start)] += 1
+
+    def record_replay(self, memory):
+        size = len(memory)
+        capacity = getattr(memory, "maxlen", None) or getattr(memory, "capacity", size)
+        memory_bytes = replay_memory_bytes(memory)
+        with self.lock:
+            self.replay_size = size
+            self.replay_capacity = capacity
+            self.replay_bytes = memory_bytes
+
+    def record_checkpoint(self):
+        with self.lock:
+            self.last_checkpoint = time.time()
+
+    def render(self):
+        # all metrics in the Prometheus text exposition format
+        with self.lock:
+            now = time.monotonic()
+            since, env_then, train_then = self.rate_samples[0]
+            elapsed = max(now - since, 1e-9)
+            metrics = [
+                ("snake_uptime_seconds", "gauge", "Seconds since training started", [("", time.time() - self.start_time)]),
+                ("snake_env_steps_total", "counter", "Environment steps played", [("", self.env_steps)]),
+                ("snake_env_steps_per_second", "gauge", "Environment steps per second, recent average",
+                 [("", (self.env_steps - env_then) / elapsed)]),
+                ("snake_train_steps_total", "counter", "Training steps taken", [("", self.train_steps)]),
+                ("snake_train_steps_per_second", "gauge", "Training steps per second, recent average",
+                 [("", (self.train_steps - train_then) / elapsed)]),
+                ("snake_games_total", "counter", "Games played by how they started (fresh, resumed)",
+                 [('{{start="{}"}}'.format(start), count) for start, count in sorted(self.games.items())]),
+                ("snake_score_mean", "gauge", "Mean score of the last {} games by how they started".format(self.window),
+                 [('{{start="{}"}}'.format(start), sum(scores) / len(scores) if scores else math.nan)
+                  for start, scores in sorted(self.scores.items())]),
+                ("snake_replay_transitions", "gauge", "Transitions in the replay memory", [("", self.replay_size)]),
+                ("snake_replay_fill_ratio", "gauge", "Replay memory fill ratio",
+                 [("", self.replay_size / self.replay_capacity if self.replay_capacity else 0)]),
+                ("snake_replay_memory_bytes", "gauge", "Bytes held by the replay memory", [("", self.replay_bytes)]),
+                ("snake_checkpoint_age_seconds", "gauge", "Seconds since the model was last saved",
+                 [("", time.time() - self.last_checkpoint if self.last_checkpoint is not None else math.nan)]),
+                ("snake_phase_seconds_total", "counter", "Seconds spent in every phase of the training loop",
+                 [('{{phase="{}"}}'.format(name), seconds) for name, seconds in sorted(self.phase_seconds.items())]),
+                ("snake_games_ended_total", "counter", "Games by the reason they ended (collision, starvation, loop)",
+                 [('{{reason="{}",start="{}"}}'.format(reason, start), count)
+                  for (reason, start), count in sorted(self.end_reasons.items())]),
+            ]
+            if self.thread_config is not None:
+                labels = ",".join('{}="{}"'.format(key, value) for key, value in sorted(self.thread_config.items())
+                                  if key != "cores")
+                metrics.append(("snake_thread_config_info", "gauge", "Torch threading setup of the training process",
+                                [("{" + labels + "}", 1)]))
+
+        lines = []
+        for name, kind, description, samples in metrics:
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for labels, value in samples:
+                lines.append("{}{} {}".format(name, labels, float(value)))
+        return "\n".join(lines) + "\n"
+
+    def start_server(self, port = 8000, host = "127.0.0.1"):
+        """
+        serves the metrics on http://host:port/metrics from a daemon thread,
+        the training loop is never blocked by a scrape longer than the lock is held
+        """
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                # keep the training output clean
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        return self.server
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None